@@ -0,0 +1,61 @@
+// Infinite scroll for the vacation list
+//
+// The list page renders the first page of cards plus a sentinel element whose
+// data-next-url points at the next keyset page. When the sentinel scrolls into
+// view the next batch of cards is fetched and appended, and the sentinel moves
+// on to the cursor returned in the X-Next-Cursor response header.
+
+document.addEventListener('DOMContentLoaded', function() {
+    const grid = document.getElementById('vacation-grid');
+    const sentinel = document.getElementById('vacation-scroll-sentinel');
+    if (!grid || !sentinel || !('IntersectionObserver' in window)) {
+        return;
+    }
+
+    let loading = false;
+
+    function loadNextPage(observer) {
+        const nextUrl = sentinel.dataset.nextUrl;
+        if (loading || !nextUrl) {
+            return;
+        }
+        loading = true;
+
+        fetch(nextUrl, { credentials: 'same-origin' })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Failed to load vacations (${response.status})`);
+                }
+                const nextCursor = response.headers.get('X-Next-Cursor');
+                return response.text().then(html => ({ html, nextCursor }));
+            })
+            .then(({ html, nextCursor }) => {
+                grid.insertAdjacentHTML('beforeend', html);
+                if (nextCursor) {
+                    const url = new URL(nextUrl, window.location.href);
+                    url.searchParams.set('after', nextCursor);
+                    sentinel.dataset.nextUrl = url.pathname + url.search;
+                    // Re-observe so a sentinel that is still visible fires again
+                    observer.unobserve(sentinel);
+                    observer.observe(sentinel);
+                } else {
+                    observer.disconnect();
+                    sentinel.remove();
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+            })
+            .finally(() => {
+                loading = false;
+            });
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNextPage(observer);
+        }
+    }, { rootMargin: '400px' });
+
+    observer.observe(sentinel);
+});
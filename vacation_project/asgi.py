@@ -3,6 +3,11 @@ ASGI config for vacation_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The login and registration views are async and hash passwords on a bounded
+thread pool (vacations.hashing), so serve the project with an ASGI server
+such as ``uvicorn vacation_project.asgi:application`` to keep login bursts
+from tying up workers.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
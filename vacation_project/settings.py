@@ -49,11 +49,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'vacations.middleware.PrometheusMiddleware',
+    'vacations.middleware.RequestTimingMiddleware',
+    'vacations.middleware.ProfilingMiddleware',
+    'vacations.middleware.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'vacations.middleware.SnapshotAuthenticationMiddleware',
+    'vacations.routers.PrimaryPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'vacations.middleware.SuppressWellKnownMiddleware',
@@ -82,6 +87,15 @@ WSGI_APPLICATION = 'vacation_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection reuse: DB_POOL=True uses Django's connection pool (psycopg 3 with
+# psycopg_pool), the intended setup under ASGI, where requests do not stay on
+# one thread and a connection kept per thread would leak. With DB_POOL off,
+# connections close after every request unless DB_CONN_MAX_AGE sets how many
+# seconds each worker thread keeps its own (empty for unlimited), which only
+# suits a WSGI server with a fixed set of threads.
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() in ['true', '1', 'yes', 'on']
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '0')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -90,9 +104,61 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'password'),
         'HOST': os.environ.get('DB_HOST', 'db'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        # Pooled connections are returned to the pool instead of being kept per thread
+        'CONN_MAX_AGE': 0 if DB_POOL else (int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None),
+        # Check a reused connection before the first query of each request
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True').lower() in ['true', '1', 'yes', 'on'],
     }
 }
 
+if DB_POOL:
+    # The stock backend plus pool gauges for /metrics/
+    DATABASES['default']['ENGINE'] = 'vacations.db.postgresql'
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            # Seconds before a pooled connection is replaced, and to wait for a free one
+            'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '1800')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        },
+    }
+
+
+# Read replicas: DB_REPLICA_HOSTS=replica1,replica2 adds aliases replica_1,
+# replica_2, ... with the primary's credentials. List pages, the JSON feed and
+# the admin vacation list read from them; clients stay on the primary for
+# REPLICA_PIN_SECONDS after a write so they always see their own changes.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['vacations.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend (e.g. django.core.cache.backends.filebased.FileBasedCache and a
+# directory) when running several worker processes, so invalidation reaches
+# every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'vacation-cache'),
+    }
+}
+
+# Resolve request.user from a cached snapshot instead of a query per request
+USER_SNAPSHOT_AUTH = os.environ.get('USER_SNAPSHOT_AUTH', 'False').lower() in ['true', '1', 'yes', 'on']
+USER_SNAPSHOT_TIMEOUT = int(os.environ.get('USER_SNAPSHOT_TIMEOUT', '3600'))
+
+# Seconds a rendered vacation card fragment may live in the cache
+VACATION_CARD_CACHE_TIMEOUT = int(os.environ.get('VACATION_CARD_CACHE_TIMEOUT', '86400'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,6 +200,26 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/app/media'
 
+# How /media/ files reach the client: 'django' streams them from the worker,
+# 'x-accel' (nginx) and 'x-sendfile' (Apache/lighttpd) hand them to the front server
+MEDIA_SERVING_MODE = os.environ.get('MEDIA_SERVING_MODE', 'django')
+# Internal nginx location aliased to MEDIA_ROOT, used by the x-accel mode
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+# max-age for media names that may be overwritten; hash-named files are cached for a year
+MEDIA_CACHE_MAX_AGE = int(os.environ.get('MEDIA_CACHE_MAX_AGE', '3600'))
+
+# Widths (px) of the resized WebP/JPEG variants generated for vacation images
+VACATION_IMAGE_WIDTHS = [320, 640, 960]
+
+# Largest accepted image upload in bytes, enforced while the upload streams in
+VACATION_IMAGE_MAX_UPLOAD_SIZE = int(os.environ.get('VACATION_IMAGE_MAX_UPLOAD_SIZE', str(20 * 1024 * 1024)))
+
+FILE_UPLOAD_HANDLERS = [
+    'vacations.uploadhandlers.MaxSizeUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 AUTH_USER_MODEL = 'vacations.User'
 
 AUTHENTICATION_BACKENDS = [
@@ -141,9 +227,67 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Threads that run password hashing for the async login/register views, and how
+# many more hashes may wait for one before new attempts get a 503
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', '2'))
+PASSWORD_HASHING_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASHING_QUEUE_SIZE', '16'))
+
+# Token buckets for login and registration POSTs: (burst size, seconds to refill it).
+# State lives in the default cache, so use a shared backend (database, memcached,
+# redis) to enforce the limits across processes.
+AUTH_THROTTLE_ENABLED = os.environ.get('AUTH_THROTTLE_ENABLED', 'True').lower() in ['true', '1', 'yes', 'on']
+AUTH_THROTTLE_IP_BUCKET = (int(os.environ.get('AUTH_THROTTLE_IP_BURST', '20')), 60)
+AUTH_THROTTLE_EMAIL_BUCKET = (int(os.environ.get('AUTH_THROTTLE_EMAIL_BURST', '5')), 300)
+# Ceiling on password hashes started per second by login and registration,
+# across every process sharing the cache (0 for no limit)
+PASSWORD_HASHES_PER_SECOND = float(os.environ.get('PASSWORD_HASHES_PER_SECOND', '10'))
+# The per-IP bucket keys on REMOTE_ADDR. Behind a reverse proxy that is the
+# proxy's address, so every client would share one bucket (and one client could
+# drain the hashing budget for everyone). Name the META key of the header the
+# proxy sets (e.g. HTTP_X_REAL_IP, or HTTP_X_FORWARDED_FOR, whose last entry is
+# used) and the proxy addresses it is accepted from; the proxy must overwrite
+# or append to that header, never pass a client's value through unchanged.
+CLIENT_IP_HEADER = os.environ.get('CLIENT_IP_HEADER', '')
+TRUSTED_PROXY_IPS = [ip.strip() for ip in os.environ.get('TRUSTED_PROXY_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 
+# Vacations shown per page (and per infinite-scroll fetch) on the list and feed
+VACATION_PAGE_SIZE = int(os.environ.get('VACATION_PAGE_SIZE', '12'))
+
+# Share of requests (0 to 1) that get query/DB/template timings in a
+# Server-Timing header and a request_timing line in the vacations log. Off by
+# default under DEBUG (and so in tests), where an INFO line per request would
+# drown the console; set it to 1 locally to see every request's timings.
+REQUEST_TIMING_SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '0' if DEBUG else '0.01'))
+
+# Stack-sampling profiler (off unless PROFILING_ENABLED): profiles a
+# PROFILING_SAMPLE_RATE share of requests plus requests with a signed X-Profile
+# header, sampling every PROFILING_INTERVAL seconds into PROFILING_DIR
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() in ['true', '1', 'yes', 'on']
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = float(os.environ.get('PROFILING_INTERVAL', '0.005'))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_TOKEN_MAX_AGE = int(os.environ.get('PROFILING_TOKEN_MAX_AGE', '86400'))
+
+# Per-process query counts and timings by view and SQL fingerprint, served
+# to admins at /metrics/queries/; queries slower than SLOW_QUERY_MS are logged
+QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', 'True').lower() in ['true', '1', 'yes', 'on']
+QUERY_STATS_MAX_FINGERPRINTS = int(os.environ.get('QUERY_STATS_MAX_FINGERPRINTS', '1000'))
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+
+# Prometheus metrics at /metrics/, readable by admins and, when set, from the
+# scraper addresses in METRICS_ALLOWED_IPS (matched against REMOTE_ADDR). The
+# list is empty by default: behind a reverse proxy on the same host every
+# request arrives from loopback, so never list 127.0.0.1 or ::1 there.
+# Instead, have the scraper reach the app server directly on an address the
+# proxy does not forward, or block /metrics/ at the proxy. Set
+# PROMETHEUS_MULTIPROC_DIR in the environment to aggregate several worker
+# processes (see vacations/metrics.py).
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() in ['true', '1', 'yes', 'on']
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -157,16 +301,25 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'vacations.log_handlers.JSONFormatter',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'simple'
         },
+        # JSON lines written by a background thread in batches, so disk
+        # latency stays off the request path. Each process rotates its own
+        # file, so the name includes {pid}; drop it from LOG_FILE only when
+        # a single process writes the log.
         'file': {
-            'class': 'logging.FileHandler',
-            'filename': BASE_DIR / 'vacation_app.log',
-            'formatter': 'verbose',
+            'class': 'vacations.log_handlers.QueuedRotatingFileHandler',
+            'filename': os.environ.get('LOG_FILE', str(BASE_DIR / 'vacation_app.{pid}.log')),
+            'max_bytes': int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            'backup_count': int(os.environ.get('LOG_BACKUP_COUNT', '5')),
+            'formatter': 'json',
         },
     },
     'root': {
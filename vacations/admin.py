@@ -1,6 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import transaction
+from django.db.models import F
+from .cards import bump_likes_version
 from .models import User, Role, Country, Vacation, Like
+from .routers import read_from_replica
 
 
 @admin.register(Role)
@@ -44,10 +48,12 @@ class VacationAdmin(admin.ModelAdmin):
     list_filter = ['country', 'start_date']
     search_fields = ['country__country_name', 'description']
     ordering = ['start_date']
+    readonly_fields = ['like_count']
     
-    def like_count(self, obj):
-        return obj.like_count
-    like_count.short_description = 'Likes'
+    def changelist_view(self, request, extra_context=None):
+        # The list is read from a replica; bulk actions (POST) stay on the primary
+        with read_from_replica(request):
+            return super().changelist_view(request, extra_context)
 
 
 @admin.register(Like)
@@ -55,3 +61,27 @@ class LikeAdmin(admin.ModelAdmin):
     list_display = ['user', 'vacation']
     list_filter = ['vacation__country']
     search_fields = ['user__email', 'vacation__country__country_name']
+    
+    # Keep Vacation.like_count in step with likes managed from the admin
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            old_vacation_id = Like.objects.get(pk=obj.pk).vacation_id if change else None
+            super().save_model(request, obj, form, change)
+            if old_vacation_id != obj.vacation_id:
+                if old_vacation_id is not None:
+                    Vacation.objects.filter(pk=old_vacation_id).update(like_count=F('like_count') - 1)
+                Vacation.objects.filter(pk=obj.vacation_id).update(like_count=F('like_count') + 1)
+                transaction.on_commit(bump_likes_version)
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            Vacation.objects.filter(pk=obj.vacation_id).update(like_count=F('like_count') - 1)
+            transaction.on_commit(bump_likes_version)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            vacation_ids = list(queryset.values_list('vacation_id', flat=True).distinct())
+            super().delete_queryset(request, queryset)
+            Vacation.objects.filter(pk__in=vacation_ids).recount_likes()
+            transaction.on_commit(bump_likes_version)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class VacationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vacations'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .instrumentation import install_template_timer
+        install_template_timer()
@@ -1,5 +1,8 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+
+from .hashing import amake_password, averify_password
 
 User = get_user_model()
 
@@ -28,9 +31,50 @@ class EmailBackend(ModelBackend):
                 return user
         return None
     
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """
+        Async authenticate that hashes on the bounded pool in vacations.hashing.
+        
+        Failed attempts raise PermissionDenied rather than returning None, which
+        stops Django from falling through to ModelBackend: it would look up the
+        same email and hash the password again outside the pool.
+        
+        Raises:
+            HashingBusy: If the hashing pool is saturated
+        """
+        if username is None:
+            username = kwargs.get('email')
+        
+        if username is None or password is None:
+            return None
+        
+        try:
+            user = await User.objects.select_related('role').aget(email=username)
+        except User.DoesNotExist:
+            # Hash once anyway so unknown emails take as long as wrong passwords
+            await amake_password(password)
+            raise PermissionDenied
+        
+        is_correct, must_update = await averify_password(password, user.password)
+        if is_correct and must_update:
+            user.password = await amake_password(password)
+            await user.asave(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        raise PermissionDenied
+    
     def get_user(self, user_id):
+        # Load the role in the same query; every request checks user.is_admin
+        try:
+            user = User.objects.select_related('role').get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+    
+    async def aget_user(self, user_id):
+        # As get_user; user.is_admin must not query later from async code
         try:
-            user = User.objects.get(pk=user_id)
+            user = await User.objects.select_related('role').aget(pk=user_id)
         except User.DoesNotExist:
             return None
         return user if self.user_can_authenticate(user) else None
\ No newline at end of file
@@ -0,0 +1,116 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def benchmark_endpoint(send: Callable, iterations: int, warmup: int = 5, memory_samples: int = 20) -> dict:
+    """
+    Time repeated requests to one endpoint.
+
+    Latency and query counts come from a plain pass. Peak memory comes from a
+    second, shorter pass under tracemalloc, which would otherwise slow the
+    timed requests down.
+
+    Args:
+        send: Callable issuing one request and returning the response
+        iterations: Timed requests
+        warmup: Untimed requests first, to fill caches and connections
+        memory_samples: Requests traced for peak memory
+
+    Returns:
+        dict: Latency percentiles in ms, queries per request, peak KiB and status codes
+    """
+    for _ in range(warmup):
+        send()
+
+    timings = []
+    statuses = Counter()
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries.append(1)
+        return execute(sql, params, many, context)
+
+    # CaptureQueriesContext would lose queries: request_started resets queries_log
+    with connection.execute_wrapper(count_query):
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = send()
+            timings.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(min(memory_samples, iterations)):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            send()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'requests': iterations,
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'queries_per_request': round(len(queries) / iterations, 2),
+        'peak_memory_kib': round(peak / 1024, 1),
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def compare_results(current: dict, baseline: dict) -> List[str]:
+    """
+    Describe how each endpoint's p50/p95 and query count moved against a saved run.
+    """
+    lines = [f"Compared with {baseline.get('revision') or 'baseline'} ({baseline.get('timestamp', '?')}):"]
+    for name, result in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            lines.append(f'  {name}: not in baseline')
+            continue
+        changes = []
+        for key in ('p50_ms', 'p95_ms', 'queries_per_request'):
+            if before[key]:
+                changes.append(f'{key} {(result[key] - before[key]) / before[key]:+.1%}')
+            else:
+                changes.append(f'{key} {before[key]} -> {result[key]}')
+        lines.append(f"  {name}: {', '.join(changes)}")
+    return lines
+
+
+def load_results(path: str) -> dict:
+    with open(path) as handle:
+        return json.load(handle)
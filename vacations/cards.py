@@ -0,0 +1,127 @@
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .metrics import count_cache_lookups
+
+# Bump when _vacation_card_body.html changes so stale fragments are ignored
+CARD_TEMPLATE_VERSION = 2
+CARD_VARIANTS = ('admin', 'user')
+LIKES_VERSION_KEY = 'vacations:likes-version'
+
+
+def card_cache_key(vacation_id: int, updated_at: datetime, variant: str) -> str:
+    """
+    Cache key of one card variant for one version of a vacation row.
+
+    The row version (updated_at, to the microsecond) is part of the key, so a
+    render of an older row, e.g. one that raced an edit or came from a lagging
+    replica, can only ever be served for that older row.
+    """
+    version = int(updated_at.timestamp()) * 1_000_000 + updated_at.microsecond
+    return f'vacations:card:v{CARD_TEMPLATE_VERSION}:{variant}:{vacation_id}:{version}'
+
+
+def attach_card_html(vacations: Iterable, is_admin: bool) -> None:
+    """
+    Attach the cached, user-independent card markup to each vacation.
+
+    All fragments for the page are fetched with one get_many call; misses are
+    rendered from _vacation_card_body.html and stored with one set_many call.
+    The per-user parts of a card (like button, like count) are rendered
+    outside the fragment, so one cached copy serves every user.
+
+    Args:
+        vacations: Vacations on the current page (with country loaded)
+        is_admin: Whether to use the admin card variant
+    """
+    vacations = list(vacations)
+    keys = card_cache_keys(vacations, is_admin)
+    missing = fill_card_html(vacations, is_admin, keys, cache.get_many(keys.values()))
+    if missing:
+        cache.set_many(missing, settings.VACATION_CARD_CACHE_TIMEOUT)
+
+
+async def aattach_card_html(vacations: Iterable, is_admin: bool) -> None:
+    """
+    Async version of ``attach_card_html``.
+
+    Missing fragments are rendered in a worker thread: the card template
+    checks storage for image variants, which blocks.
+    """
+    vacations = list(vacations)
+    keys = card_cache_keys(vacations, is_admin)
+    cached = await cache.aget_many(keys.values())
+    missing = await sync_to_async(fill_card_html)(vacations, is_admin, keys, cached)
+    if missing:
+        await cache.aset_many(missing, settings.VACATION_CARD_CACHE_TIMEOUT)
+
+
+def card_cache_keys(vacations: List, is_admin: bool) -> Dict[int, str]:
+    variant = 'admin' if is_admin else 'user'
+    return {vacation.pk: card_cache_key(vacation.pk, vacation.updated_at, variant) for vacation in vacations}
+
+
+def fill_card_html(vacations: List, is_admin: bool, keys: Dict[int, str], cached: Dict[str, str]) -> Dict[str, str]:
+    """
+    Set ``card_html`` on each vacation, rendering the fragments not in ``cached``.
+
+    Returns:
+        Dict[str, str]: Newly rendered fragments by cache key, to be stored
+    """
+    missing = {}
+    for vacation in vacations:
+        html = cached.get(keys[vacation.pk])
+        if html is None:
+            html = render_to_string('vacations/_vacation_card_body.html', {
+                'vacation': vacation,
+                'is_admin': is_admin,
+            })
+            missing[keys[vacation.pk]] = html
+        vacation.card_html = mark_safe(html)
+
+    count_cache_lookups('card', len(vacations) - len(missing), len(missing))
+    return missing
+
+
+def invalidate_card(vacation_id: int, updated_at: datetime) -> None:
+    """
+    Drop every cached variant of one version of a vacation's card.
+
+    Edits change the key through updated_at, so this only frees memory early,
+    except for a version whose rendering changed without a row change (new
+    image variants).
+    """
+    invalidate_cards([(vacation_id, updated_at)])
+
+
+def invalidate_cards(versions: Iterable[Tuple[int, datetime]]) -> None:
+    cache.delete_many([
+        card_cache_key(vacation_id, updated_at, variant)
+        for vacation_id, updated_at in versions
+        for variant in CARD_VARIANTS
+    ])
+
+
+def get_likes_version() -> int:
+    """
+    Return the current like version, which changes whenever any like is toggled.
+
+    The version is a nanosecond timestamp rather than a counter, so a value
+    lost to cache eviction is never handed out again.
+    """
+    return cache.get_or_set(LIKES_VERSION_KEY, time.time_ns, timeout=None)
+
+
+async def aget_likes_version() -> int:
+    return await cache.aget_or_set(LIKES_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_likes_version() -> None:
+    cache.set(LIKES_VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,27 @@
+from django.db.backends.postgresql import base
+
+from vacations.metrics import update_pool_gauges
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend publishing connection pool occupancy as it changes.
+
+    Django sends no signal when a pooled connection is checked out or
+    returned, so the gauges are refreshed here, right after each getconn and
+    putconn. Without DB_POOL it behaves exactly like the stock backend.
+    """
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        if self.pool:
+            update_pool_gauges(self.alias, self.pool)
+        return connection
+
+    def _close(self):
+        pool = self.pool if self.connection is not None else None
+        try:
+            return super()._close()
+        finally:
+            if pool:
+                update_pool_gauges(self.alias, pool)
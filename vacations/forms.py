@@ -32,6 +32,9 @@ class UserRegistrationForm(UserCreationForm):
         widget=forms.PasswordInput(attrs={'placeholder': 'Confirm Password', 'class': 'form-control'})
     )
     
+    # Set by the async register view, which hashes on the bounded pool
+    password_hash = None
+    
     class Meta:
         model = User
         fields = ('first_name', 'last_name', 'email', 'password1', 'password2')
@@ -73,6 +76,14 @@ class UserRegistrationForm(UserCreationForm):
         if commit:
             user.save()
         return user
+    
+    def set_password_and_save(self, user, password_field_name='password1', commit=True):
+        if self.password_hash is None:
+            return super().set_password_and_save(user, password_field_name, commit)
+        user.password = self.password_hash
+        if commit:
+            user.save()
+        return user
 
 
 class UserLoginForm(forms.Form):
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .metrics import HASHING_POOL
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusy(Exception):
+    """
+    Raised when every hashing worker is busy and the wait queue is full.
+    """
+
+
+class BoundedHashingExecutor:
+    """
+    Thread pool for password hashing with a hard cap on queued work.
+
+    PBKDF2 at Django's default work factor takes hundreds of milliseconds
+    per call. Running it here instead of on the request worker or the shared
+    sync_to_async thread keeps other requests moving during a login burst.
+    At most ``max_workers`` hashes run at once and ``max_queue`` more may
+    wait; beyond that ``run`` fails fast with HashingBusy so callers can
+    answer 503 instead of piling up requests.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._peak_in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    async def run(self, func, *args):
+        """
+        Run ``func(*args)`` on the pool and wait for its result.
+
+        Raises:
+            HashingBusy: If the pool and its queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            logger.warning('Password hashing queue full (%d running, %d queued)', self.max_workers, self.max_queue)
+            raise HashingBusy()
+
+        submitted = time.perf_counter()
+        with self._lock:
+            self._submitted += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        HASHING_POOL.labels('queued').inc()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += started - submitted
+            HASHING_POOL.labels('queued').dec()
+            HASHING_POOL.labels('running').inc()
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._in_flight -= 1
+                    self._completed += 1
+                    self._run_seconds += time.perf_counter() - started
+                HASHING_POOL.labels('running').dec()
+                # Released here, not by the caller, so a cancelled request
+                # keeps its slot until the hash actually finishes
+                self._slots.release()
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, task)
+
+    def metrics(self) -> dict:
+        """
+        Snapshot of queueing and backpressure counters.
+
+        Returns:
+            dict: Pool limits, current occupancy and cumulative totals
+        """
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'queue_limit': self.max_queue,
+                'running': self._running,
+                'queued': self._in_flight - self._running,
+                'peak_in_flight': self._peak_in_flight,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'wait_seconds_total': self._wait_seconds,
+                'run_seconds_total': self._run_seconds,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_executor: Optional[BoundedHashingExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> BoundedHashingExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedHashingExecutor(
+                    settings.PASSWORD_HASHING_WORKERS,
+                    settings.PASSWORD_HASHING_QUEUE_SIZE,
+                )
+    return _executor
+
+
+@receiver(setting_changed)
+def reset_executor(setting, **kwargs):
+    global _executor
+    if setting in ('PASSWORD_HASHING_WORKERS', 'PASSWORD_HASHING_QUEUE_SIZE') and _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def hashing_metrics() -> dict:
+    return get_executor().metrics()
+
+
+async def amake_password(raw_password: str) -> str:
+    return await get_executor().run(hashers.make_password, raw_password)
+
+
+async def averify_password(raw_password: str, encoded: str) -> Tuple[bool, bool]:
+    """
+    Check a password on the hashing pool.
+
+    Returns:
+        Tuple[bool, bool]: Whether it matches, and whether the stored hash
+        should be upgraded to the preferred hasher
+    """
+    return await get_executor().run(hashers.verify_password, raw_password, encoded)
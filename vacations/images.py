@@ -0,0 +1,314 @@
+import hashlib
+import io
+import logging
+import math
+import os
+import posixpath
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, transaction
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+from .cards import invalidate_card
+from .metrics import UPLOAD_BYTES
+
+logger = logging.getLogger(__name__)
+
+# extension -> (Pillow format, MIME type, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+IMAGE_DIRECTORY = 'images/vacation_images'
+# Originals are stored as <sha256>.<ext> and variants as <sha256>-<width>w.<ext>
+CONTENT_ADDRESSED_RE = re.compile(r'(?:^|/)[0-9a-f]{64}(?:-\d+w)?\.[a-z0-9]+$')
+SAFE_EXTENSION_RE = re.compile(r'\.[a-z0-9]{1,5}')
+# EXIF orientations that swap width and height
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+_variant_executor: Optional[ThreadPoolExecutor] = None
+_variant_executor_lock = threading.Lock()
+
+
+def variant_name(image_file: str, width: int, extension: str) -> str:
+    """
+    Storage name of one resized variant of an uploaded vacation image.
+
+    ``images/vacation_images/rome.jpg`` at 640px as WebP becomes
+    ``images/vacation_images/variants/rome-640w.webp``.
+    """
+    directory, filename = posixpath.split(image_file)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}-{width}w.{extension}')
+
+
+def generate_variants(image_file: str, force: bool = False, storage=default_storage) -> List[str]:
+    """
+    Create the resized WebP and JPEG variants of a stored vacation image.
+
+    Variants are only produced for widths smaller than the original, so small
+    images are never upscaled. Existing variants are kept unless ``force``.
+    JPEGs are decoded at the smallest power-of-two scale that still leaves
+    twice the largest variant's width (as Image.thumbnail does), so a large
+    photo is never decoded at full resolution.
+
+    Args:
+        image_file: Storage name of the original image
+        force: Regenerate variants that already exist
+        storage: Storage backend holding the image
+
+    Returns:
+        List[str]: Storage names of the variants written
+    """
+    try:
+        with storage.open(image_file) as source:
+            original = Image.open(source)
+            full_width, full_height = original.size
+            if original.getexif().get(ExifTags.Base.Orientation) in ROTATED_ORIENTATIONS:
+                full_width, full_height = full_height, full_width
+            widths = [width for width in settings.VACATION_IMAGE_WIDTHS if width < full_width]
+            if not widths:
+                return []
+            scale = 2 * max(widths) / full_width
+            if scale < 1:
+                original.draft(None, (math.ceil(original.width * scale), math.ceil(original.height * scale)))
+            original = ImageOps.exif_transpose(original)
+            original.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as exc:
+        logger.warning('Cannot generate variants for %s: %s', image_file, exc)
+        return []
+
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+
+    written = []
+    for width in widths:
+        resized = None
+        for extension, (image_format, _, options) in VARIANT_FORMATS.items():
+            name = variant_name(image_file, width, extension)
+            if storage.exists(name):
+                if not force:
+                    continue
+                storage.delete(name)
+            if resized is None:
+                height = round(full_height * width / full_width)
+                # reducing_gap shrinks formats without draft support (PNG, WebP) cheaply first
+                resized = original.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            written.append(storage.save(name, ContentFile(buffer.getvalue())))
+    return written
+
+
+def variant_executor() -> ThreadPoolExecutor:
+    """
+    Return this process's single background thread for variant generation.
+    """
+    global _variant_executor
+    with _variant_executor_lock:
+        if _variant_executor is None:
+            _variant_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+        return _variant_executor
+
+
+def _forget_variant_executor():
+    # The worker thread does not survive fork(); the child starts its own
+    global _variant_executor
+    _variant_executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_variant_executor)
+
+
+def schedule_variants(vacation) -> None:
+    """
+    Generate an uploaded image's variants in the background once the transaction commits.
+
+    Decoding and resizing take long enough that the upload request should
+    not wait for them. Until the variants exist the card falls back to the
+    original image; the vacation's cached card is dropped once they are
+    written. Variants lost to a crash are recreated by the
+    generate_image_variants command.
+
+    Args:
+        vacation: Saved vacation whose card shows the image
+    """
+    image_file, vacation_id, updated_at = vacation.image_file, vacation.pk, vacation.updated_at
+    transaction.on_commit(
+        lambda: variant_executor().submit(_generate_for_vacation, image_file, vacation_id, updated_at)
+    )
+
+
+def _generate_for_vacation(image_file: str, vacation_id: int, updated_at) -> None:
+    try:
+        if generate_variants(image_file):
+            invalidate_card(vacation_id, updated_at)
+    except Exception:
+        logger.exception('Generating variants for %s failed', image_file)
+
+
+def wait_for_variants() -> None:
+    """
+    Block until every variant job scheduled so far has finished.
+    """
+    variant_executor().submit(lambda: None).result()
+
+
+def content_hash(upload) -> str:
+    """
+    SHA-256 hex digest of an uploaded file, read chunk by chunk.
+    """
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_addressed_name(digest: str, original_name: str) -> str:
+    """
+    Storage name for an image with the given content hash.
+
+    Files are fanned out over 256 directories by the first two hex digits,
+    e.g. ``images/vacation_images/3f/3fa1...c9.jpg``. Only the extension of
+    the client-provided name is kept.
+    """
+    extension = posixpath.splitext(original_name)[1].lower()
+    if extension == '.jpeg':
+        extension = '.jpg'
+    if not SAFE_EXTENSION_RE.fullmatch(extension):
+        extension = '.jpg'
+    return f'{IMAGE_DIRECTORY}/{digest[:2]}/{digest}{extension}'
+
+
+def is_content_addressed(name: str) -> bool:
+    """
+    Whether a storage name is a hashed original or one of its variants.
+
+    The bytes behind such a name never change, so it is safe to cache forever.
+    """
+    return bool(CONTENT_ADDRESSED_RE.search(name))
+
+
+def lock_image(image_file: str, using: str = DEFAULT_DB_ALIAS) -> None:
+    """
+    Hold a lock on an image name until the current transaction ends.
+
+    Uploads that reuse a stored file and ``release_image`` both take it, so
+    a file is never deleted between an upload finding it and the upload's
+    vacation row being committed. PostgreSQL uses a transaction-level
+    advisory lock keyed by the name; SQLite allows one writer at a time, so
+    starting the write transaction is the lock there.
+
+    Raises:
+        TransactionManagementError: If called outside transaction.atomic()
+    """
+    # Imported here because models -> signals -> images would otherwise be circular
+    from .models import Vacation
+
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        raise transaction.TransactionManagementError('lock_image() must be called inside a transaction')
+    if connection.vendor == 'postgresql':
+        key = int.from_bytes(hashlib.sha256(image_file.encode()).digest()[:8], 'big', signed=True)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+    else:
+        Vacation.objects.using(using).filter(image_file=image_file).update(image_file=image_file)
+
+
+def save_uploaded_image(upload, storage=default_storage) -> str:
+    """
+    Store an uploaded vacation image under its content hash.
+    
+    Identical uploads map to the same name, so a file that is already stored
+    is not written again and its existing variants are reused. New files are
+    handed to the storage backend as-is; FileSystemStorage moves a temporary
+    upload into place or copies an in-memory one chunk by chunk, so the image
+    is never read into one bytes object. Variants are left to
+    ``schedule_variants``.
+    
+    Call it inside transaction.atomic() together with the save of the
+    vacation that references the image: the image stays locked against
+    ``release_image`` until that transaction ends.
+    
+    Args:
+        upload: UploadedFile from request.FILES
+        storage: Storage backend to save into
+    
+    Returns:
+        str: Storage name of the saved original
+    
+    Raises:
+        TransactionManagementError: If called outside transaction.atomic()
+    """
+    path = content_addressed_name(content_hash(upload), upload.name)
+    UPLOAD_BYTES.inc(upload.size)
+    lock_image(path)
+    if storage.exists(path):
+        return path
+
+    saved = storage.save(path, upload)
+    if saved != path:
+        # An identical upload was stored between the exists() check and save()
+        storage.delete(saved)
+    return path
+
+
+def release_image(image_file: str, storage=default_storage) -> bool:
+    """
+    Delete a content-addressed image and its variants once nothing uses it.
+
+    Vacation.image_file is the reference count: the file is kept while any
+    vacation still points at it. The check and the delete run under
+    ``lock_image``, so an upload of the same bytes either sees the file gone
+    and stores it again, or commits its reference before the check. Images
+    with legacy names (the default image and the seeded ones) are never
+    deleted.
+
+    Args:
+        image_file: Storage name of the original image
+        storage: Storage backend holding the image
+
+    Returns:
+        bool: True if the files were deleted
+    """
+    # Imported here because models -> signals -> images would otherwise be circular
+    from .models import Vacation
+
+    if not image_file or not is_content_addressed(image_file):
+        return False
+    with transaction.atomic():
+        lock_image(image_file)
+        if Vacation.objects.filter(image_file=image_file).exists():
+            return False
+
+        for width in settings.VACATION_IMAGE_WIDTHS:
+            for extension in VARIANT_FORMATS:
+                storage.delete(variant_name(image_file, width, extension))
+        storage.delete(image_file)
+    logger.info('Deleted unreferenced image %s', image_file)
+    return True
+
+
+def available_variants(image_file: str, storage=default_storage) -> Dict[str, List[Tuple[int, str]]]:
+    """
+    Map each variant MIME type to the (width, URL) pairs present in storage.
+    """
+    variants = {}
+    for extension, (_, mime_type, _) in VARIANT_FORMATS.items():
+        found = [
+            (width, storage.url(variant_name(image_file, width, extension)))
+            for width in settings.VACATION_IMAGE_WIDTHS
+            if storage.exists(variant_name(image_file, width, extension))
+        ]
+        if found:
+            variants[mime_type] = found
+    return variants
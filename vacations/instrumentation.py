@@ -0,0 +1,113 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.template.base import Template
+
+# Recorder of the sampled request being served; None when it isn't sampled
+_recorder: ContextVar[Optional['RequestTimings']] = ContextVar('vacations_request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Query count, DB time and template render time of one request.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def add_query(self, seconds: float):
+        self.db_seconds += seconds
+        self.queries += 1
+
+    def server_timing(self, total_seconds: float) -> str:
+        """
+        Format the timings as a Server-Timing header value.
+
+        Args:
+            total_seconds: Time spent in the whole middleware chain
+
+        Returns:
+            str: Header value with db, tpl and total metrics (durations in ms)
+        """
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.2f};desc="Template render"',
+            f'total;dur={total_seconds * 1000:.2f}',
+        ])
+
+
+@contextmanager
+def record_request():
+    """
+    Record queries and template renders of the current context inside the block.
+
+    The recorder lives in a context variable, so it also sees queries that
+    async views run through sync_to_async on another thread.
+
+    Yields:
+        RequestTimings: Timings filled in while the block runs
+    """
+    timings = RequestTimings()
+    token = _recorder.set(timings)
+    try:
+        yield timings
+    finally:
+        _recorder.reset(token)
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute_wrapper adding each query to the active recorder, if any.
+    """
+    timings = _recorder.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(time.perf_counter() - started)
+
+
+def install_query_timer(sender, connection, **kwargs):
+    """
+    connection_created receiver adding ``time_query`` to every new connection.
+    """
+    if time_query not in connection.execute_wrappers:
+        # Outermost, for the same reason as querystats.install_query_recorder
+        connection.execute_wrappers.insert(0, time_query)
+
+
+def install_template_timer():
+    """
+    Wrap Template.render so sampled requests measure render time.
+
+    Included templates render inside their parent, so only the outermost
+    render is timed. Unsampled requests pay one context variable lookup.
+    """
+    if getattr(Template.render, 'timed', False):
+        return
+    render = Template.render
+
+    @functools.wraps(render)
+    def timed_render(self, context):
+        timings = _recorder.get()
+        if timings is None:
+            return render(self, context)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template_seconds += time.perf_counter() - started
+
+    timed_render.timed = True
+    Template.render = timed_render
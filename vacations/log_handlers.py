@@ -0,0 +1,250 @@
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import weakref
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Besides time, level, logger, module and message, every field passed via
+    ``extra=`` is included, so structured log lines stay machine-readable.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class BatchRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that can write many records with one write and flush.
+    """
+
+    def emit_batch(self, records):
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        data = ''.join(lines)
+        with self.lock:
+            try:
+                if self.stream is None:
+                    self.stream = self._open()
+                if self.maxBytes > 0 and self.stream.tell() and (
+                    self.stream.tell() + len(data.encode(self.encoding or 'utf-8')) >= self.maxBytes
+                ):
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream.write(data)
+                self.stream.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener that hands everything already queued to the handler in one batch.
+
+    ``dropped`` returns how many records the producer has dropped so far; each
+    batch that follows new drops ends with a warning saying how many.
+    """
+
+    def __init__(self, log_queue, handler, batch_size, dropped=lambda: 0):
+        super().__init__(log_queue, handler)
+        self.batch_size = batch_size
+        self.dropped = dropped
+        self.reported_drops = 0
+
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail when the queue is full
+        self.queue.put(self._sentinel)
+
+    def _monitor(self):
+        log_queue = self.queue
+        handler = self.handlers[0]
+        stopping = False
+        while not stopping:
+            batch = [log_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._sentinel in batch:
+                stopping = True
+                batch = [record for record in batch if record is not self._sentinel]
+            taken = len(batch) + stopping
+            dropped = self.dropped()
+            if dropped > self.reported_drops:
+                batch.append(drop_notice(dropped - self.reported_drops))
+                self.reported_drops = dropped
+            if batch:
+                handler.emit_batch(batch)
+            for _ in range(taken):
+                log_queue.task_done()
+
+
+def drop_notice(count):
+    return logging.makeLogRecord({
+        'name': __name__,
+        'levelno': logging.WARNING,
+        'levelname': 'WARNING',
+        'msg': f'{count} log records dropped: log queue was full',
+        'dropped': count,
+    })
+
+
+class QueuedRotatingFileHandler(logging.Handler):
+    """
+    Log to a size-rotated file from a background thread.
+
+    The logging call only copies the record onto a bounded queue; a listener
+    thread formats queued records (with this handler's formatter) and writes
+    them in batches, so a slow disk never stalls a request. When the queue is
+    full, records are dropped rather than blocking the caller. The last
+    ``reserve`` slots only take WARNING and above, so a flood of INFO lines
+    cannot crowd out errors. The listener writes a warning with the number of
+    records dropped once it catches up.
+
+    This is a plain Handler that owns its queue and listener rather than a
+    QueueHandler, which logging.config.dictConfig configures specially from
+    Python 3.12 on (expecting ``queue``, ``listener`` and ``handlers`` keys).
+
+    Rotation is per process, so each process needs a file of its own: a
+    ``{pid}`` placeholder in ``filename`` is replaced with the process ID,
+    including in workers forked after the handler was created.
+
+    Args:
+        filename: Log file path, optionally containing ``{pid}``
+        max_bytes: Rotate once the file would grow past this size (0: never)
+        backup_count: Rotated files to keep
+        batch_size: Most records written per write and flush
+        queue_size: Records that may wait for the listener
+        reserve: Queue slots kept for WARNING and above (default: a tenth)
+        encoding: File encoding
+    """
+
+    target_class = BatchRotatingFileHandler
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, batch_size=256,
+                 queue_size=10000, reserve=None, encoding='utf-8'):
+        super().__init__()
+        self.queue = queue.Queue(queue_size)
+        self.filename = filename
+        self.target_options = {'maxBytes': max_bytes, 'backupCount': backup_count, 'encoding': encoding}
+        self.target = self.open_target()
+        self.batch_size = batch_size
+        self.reserve = queue_size // 10 if reserve is None else reserve
+        self.dropped = 0
+        self._closed = False
+        self.start_listener()
+        _handlers.add(self)
+
+    def open_target(self):
+        return self.target_class(self.filename.replace('{pid}', str(os.getpid())), delay=True, **self.target_options)
+
+    def start_listener(self):
+        self.listener = BatchingQueueListener(self.queue, self.target, self.batch_size, lambda: self.dropped)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        Freeze the message and exception text so the record can cross threads.
+        """
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, record):
+        if record.levelno < logging.WARNING and self.queue.qsize() >= self.queue.maxsize - self.reserve:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _restart_after_fork(self):
+        # The listener thread does not survive fork(); the child needs its own,
+        # and its own file when the name is per process
+        if self._closed:
+            return
+        self.queue = queue.Queue(self.queue.maxsize)
+        if '{pid}' in self.filename:
+            formatter = self.target.formatter
+            self.target = self.open_target()
+            self.target.setFormatter(formatter)
+        self.dropped = 0
+        self.start_listener()
+
+    def flush(self):
+        """
+        Wait until every queued record has been written.
+        """
+        if not self._closed:
+            self.queue.join()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            _handlers.discard(self)
+            self.listener.stop()
+            self.target.close()
+        super().close()
+
+
+# Open handlers, restarted in forked children by a single fork hook
+_handlers = weakref.WeakSet()
+
+
+def _restart_handlers_after_fork():
+    for handler in list(_handlers):
+        handler._restart_after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_handlers_after_fork)
@@ -0,0 +1,124 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from vacations.benchmarking import benchmark_endpoint, compare_results, git_revision, load_results
+from vacations.models import User, Vacation
+
+
+class Command(BaseCommand):
+    """
+    Django management command benchmarking the hot endpoints.
+
+    A throwaway test database is created, seeded with ``populate_db --scale``
+    and driven through Django's test client, so the full middleware stack
+    runs and the configured database is never touched. Endpoints:
+
+    - ``list``: the vacation list (``/``) for a regular user
+    - ``like``: toggling a like (``/like/<id>/``)
+    - ``login``: a successful login POST (real password hashing)
+    - ``admin_list``: the admin vacation changelist
+
+    Login throttling is switched off and replicas are ignored for the run.
+    """
+    help = 'Benchmark the hot endpoints on a seeded throwaway database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Timed requests per endpoint (default: 200)')
+        parser.add_argument('--login-iterations', type=int, default=20, help='Timed login requests (default: 20)')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint (default: 5)')
+        parser.add_argument('--users', type=int, default=2000, help='Synthetic users (default: 2000)')
+        parser.add_argument('--vacations', type=int, default=500, help='Synthetic vacations (default: 500)')
+        parser.add_argument('--likes', type=int, default=20000, help='Synthetic likes (default: 20000)')
+        parser.add_argument('--seed', type=int, default=42, help='Dataset seed (default: 42)')
+        parser.add_argument('--endpoint', action='append', choices=['list', 'like', 'login', 'admin_list'],
+                            help='Only run this endpoint (repeatable)')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+        parser.add_argument('--compare', help='Compare with results saved earlier by --output')
+
+    def handle(self, *args, **options):
+        """
+        Execute the benchmark suite.
+
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(AUTH_THROTTLE_ENABLED=False, DATABASE_REPLICAS=[]):
+                results = self.run_suite(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, result in results['endpoints'].items():
+            self.stdout.write(
+                f"{name:<11} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+                f"p99 {result['p99_ms']:8.2f} ms  {result['queries_per_request']:5.1f} queries  "
+                f"peak {result['peak_memory_kib']:8.1f} KiB  {result['status_codes']}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Saved results to {options['output']}")
+        if options['compare']:
+            for line in compare_results(results, load_results(options['compare'])):
+                self.stdout.write(line)
+
+    def run_suite(self, options):
+        self.stdout.write(f'Seeding a throwaway {connection.vendor} database...')
+        call_command(
+            'populate_db', '--scale',
+            '--users', str(options['users']),
+            '--vacations', str(options['vacations']),
+            '--likes', str(options['likes']),
+            '--seed', str(options['seed']),
+            stdout=StringIO(),
+        )
+
+        user_client = Client()
+        user_client.force_login(User.objects.get(email='user@vacation.com'))
+        admin_client = Client()
+        admin_client.force_login(User.objects.get(email='admin@vacation.com'))
+        login_client = Client()
+        login_email = f"scale-{options['seed']}-0@example.com"
+        like_url = reverse('toggle_like', args=[Vacation.objects.order_by('-like_count').values_list('pk', flat=True)[0]])
+
+        endpoints = {
+            'list': (lambda: user_client.get(reverse('vacation_list')), options['iterations']),
+            'like': (lambda: user_client.post(like_url), options['iterations']),
+            'login': (
+                lambda: login_client.post(reverse('login'), {'email': login_email, 'password': 'scale123'}),
+                options['login_iterations'],
+            ),
+            'admin_list': (lambda: admin_client.get(reverse('admin:vacations_vacation_changelist')), options['iterations']),
+        }
+        selected = options['endpoint'] or list(endpoints)
+
+        results = {}
+        for name in selected:
+            send, iterations = endpoints[name]
+            self.stdout.write(f'Running {name} ({iterations} requests)...')
+            results[name] = benchmark_endpoint(
+                send, iterations,
+                warmup=min(options['warmup'], iterations),
+                memory_samples=min(20, iterations),
+            )
+
+        return {
+            'revision': git_revision(),
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': {key: options[key] for key in ('users', 'vacations', 'likes', 'seed')},
+            'endpoints': results,
+        }
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from vacations.benchmarking import git_revision, percentile
+from vacations.models import User
+
+
+async def asgi_get(application, path, cookie):
+    """
+    Send one GET through an ASGI application, the way a server would.
+
+    Returns:
+        int: Response status code
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    status = []
+    finished = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Keep the connection open until the response is complete
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    try:
+        await application(scope, receive, send)
+    finally:
+        finished.set()
+    return status[0]
+
+
+def wsgi_get(application, path, cookie):
+    """
+    Send one GET through a WSGI application, the way a server thread would.
+
+    Returns:
+        int: Response status code
+    """
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': 'testserver',
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split(' ', 1)[0]))
+
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return status[0]
+
+
+class Command(BaseCommand):
+    """
+    Django management command comparing the read path under ASGI and WSGI.
+
+    A throwaway test database is seeded with ``populate_db --scale``, then the
+    vacation list (``/``) and the JSON feed (``/api/vacations/``) are requested
+    by a regular user through Django's own ASGI and WSGI handlers, in process
+    and with no server in between. Each concurrency level runs that many
+    closed-loop clients: every client sends its next request as soon as the
+    previous response is complete.
+
+    - ``asgi``: every client is a coroutine on one event loop
+    - ``wsgi``: requests run on a pool of ``--wsgi-threads`` threads, like a
+      threaded WSGI server; time spent waiting for a free thread counts
+      toward latency
+
+    Requests answered with a 5xx status or raising count as errors. Django's
+    async ORM and cache still hand each query to a thread, so the ASGI gain
+    comes from not holding a thread per waiting client rather than from
+    non-blocking database I/O. On PostgreSQL, high levels can exhaust
+    max_connections; those failures show up as errors.
+    """
+    help = 'Compare latency and throughput of the read path under ASGI and WSGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='10,100,1000',
+                            help='Comma-separated concurrent client counts (default: 10,100,1000)')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Requests per endpoint, mode and concurrency level (default: 2000)')
+        parser.add_argument('--wsgi-threads', type=int, default=32, help='WSGI worker threads (default: 32)')
+        parser.add_argument('--mode', action='append', choices=['asgi', 'wsgi'], help='Only run this mode (repeatable)')
+        parser.add_argument('--users', type=int, default=2000, help='Synthetic users (default: 2000)')
+        parser.add_argument('--vacations', type=int, default=500, help='Synthetic vacations (default: 500)')
+        parser.add_argument('--likes', type=int, default=20000, help='Synthetic likes (default: 20000)')
+        parser.add_argument('--seed', type=int, default=42, help='Dataset seed (default: 42)')
+        parser.add_argument('--output', help='Write results as JSON to this file')
+
+    def handle(self, *args, **options):
+        """
+        Execute the ASGI/WSGI benchmark.
+
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(DATABASE_REPLICAS=[], REQUEST_TIMING_SAMPLE_RATE=0):
+                results = self.run_suite(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Saved results to {options['output']}")
+
+    def run_suite(self, options):
+        self.stdout.write(f'Seeding a throwaway {connection.vendor} database...')
+        call_command(
+            'populate_db', '--scale',
+            '--users', str(options['users']),
+            '--vacations', str(options['vacations']),
+            '--likes', str(options['likes']),
+            '--seed', str(options['seed']),
+            stdout=StringIO(),
+        )
+        client = Client()
+        client.force_login(User.objects.get(email='user@vacation.com'))
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        # The seeding connection belongs to this thread; requests open their own
+        connection.close()
+
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        paths = {'list': reverse('vacation_list'), 'feed': reverse('vacation_feed')}
+        results = []
+        for mode in options['mode'] or ['asgi', 'wsgi']:
+            for name, path in paths.items():
+                for level in levels:
+                    result = asyncio.run(self.run_level(mode, path, cookie, level, options))
+                    result.update(mode=mode, endpoint=name, concurrency=level)
+                    results.append(result)
+                    self.stdout.write(
+                        f"{mode:<4} {name:<4} c={level:<5} p50 {result['p50_ms']:9.2f} ms  "
+                        f"p99 {result['p99_ms']:9.2f} ms  {result['requests_per_second']:8.1f} req/s  "
+                        f"{result['errors']} errors"
+                    )
+
+        return {
+            'revision': git_revision(),
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'wsgi_threads': options['wsgi_threads'],
+            'results': results,
+        }
+
+    async def run_level(self, mode, path, cookie, concurrency, options):
+        remaining = options['requests']
+        latencies = []
+        errors = 0
+
+        if mode == 'asgi':
+            application = get_asgi_application()
+
+            def send():
+                return asgi_get(application, path, cookie)
+        else:
+            application = get_wsgi_application()
+            loop = asyncio.get_running_loop()
+            executor = ThreadPoolExecutor(max_workers=options['wsgi_threads'])
+
+            def send():
+                return loop.run_in_executor(executor, wsgi_get, application, path, cookie)
+
+        async def client_loop():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    status = await send()
+                except Exception:
+                    status = None
+                latencies.append((time.perf_counter() - started) * 1000)
+                if status is None or status >= 500:
+                    errors += 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        finally:
+            if mode == 'wsgi':
+                executor.shutdown(wait=True)
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+        }
@@ -0,0 +1,91 @@
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from vacations.models import Role, User
+
+# A private in-memory cache, so the configured (possibly shared) cache is never written or cleared
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vacations-benchmark-auth',
+    }
+}
+
+
+class Command(BaseCommand):
+    """
+    Django management command comparing request throughput with and without
+    snapshot authentication (USER_SNAPSHOT_AUTH).
+
+    A throwaway user is created and logged in on a throwaway test database,
+    with the default cache swapped for a private in-memory one, so neither
+    the configured database nor the configured cache is touched. Both modes
+    hit the same URL through the full middleware stack with Django's test
+    client.
+    """
+    help = 'Measure requests per second with USER_SNAPSHOT_AUTH on and off'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode (default: 500)')
+        parser.add_argument('--path', default='/api/vacations/', help='URL to request (default: /api/vacations/)')
+
+    def handle(self, *args, **options):
+        """
+        Execute the authentication benchmark.
+
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES, DATABASE_REPLICAS=[]):
+                try:
+                    self.run_suite(options)
+                finally:
+                    # Only the benchmark's own cache is cleared
+                    cache.clear()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run_suite(self, options):
+        role, _ = Role.objects.get_or_create(role_name='user')
+        user = User.objects.create_user(
+            email='benchmark-auth@example.invalid',
+            password=None,
+            first_name='Benchmark',
+            last_name='User',
+            role=role,
+        )
+        client = Client()
+        client.force_login(user)
+
+        self.stdout.write(f"{options['requests']} requests to {options['path']}:")
+        for enabled in (False, True):
+            with override_settings(USER_SNAPSHOT_AUTH=enabled):
+                self.run_mode(client, options['path'], options['requests'], enabled)
+
+    def run_mode(self, client, path, requests, enabled):
+        # Warm up caches (including the snapshot) before timing
+        response = client.get(path)
+        if response.status_code != 200:
+            self.stderr.write(f'{path} returned {response.status_code}')
+            return
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get(path)
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"  snapshot auth {'on ' if enabled else 'off'}: {requests / elapsed:8.1f} req/s, "
+            f"{len(queries) / requests:.1f} queries/request"
+        )
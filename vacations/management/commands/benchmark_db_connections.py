@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    """
+    Django management command measuring what connection setup adds to requests.
+
+    Each simulated request sends request_started, runs ``SELECT 1`` and sends
+    request_finished, so Django opens, reuses and closes the connection the
+    way it does under a real server. The run is repeated with CONN_MAX_AGE=0
+    (a new connection for every request) and with a persistent connection.
+    When DB_POOL is enabled the first mode borrows from the pool instead of
+    connecting. Any backend works; SQLite serves as a cheap stand-in.
+    """
+    help = 'Compare per-request latency with and without persistent database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode (default: 200)')
+
+    def handle(self, *args, **options):
+        """
+        Execute the connection benchmark.
+
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        pooled = bool(connection.settings_dict.get('OPTIONS', {}).get('pool'))
+        original_max_age = connection.settings_dict['CONN_MAX_AGE']
+        self.stdout.write(f"{options['requests']} requests against {connection.vendor} ({connection.settings_dict['NAME']}):")
+        try:
+            for label, max_age in (('pooled' if pooled else 'new connection', 0), ('persistent', None)):
+                self.run_mode(label, max_age, options['requests'])
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = original_max_age
+
+    def run_mode(self, label, max_age, requests):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        opened = []
+
+        def count_connection(sender, **kwargs):
+            opened.append(1)
+
+        connection_created.connect(count_connection)
+        timings = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=self.__class__)
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection_created.disconnect(count_connection)
+
+        timings.sort()
+        self.stdout.write(
+            f'  {label:<15} mean {statistics.mean(timings):7.3f} ms  '
+            f'p50 {timings[len(timings) // 2]:7.3f} ms  '
+            f'p95 {timings[int(len(timings) * 0.95)]:7.3f} ms  '
+            f'{len(opened)} connections opened'
+        )
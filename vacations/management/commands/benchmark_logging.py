@@ -0,0 +1,116 @@
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from vacations.benchmarking import percentile
+from vacations.log_handlers import BatchRotatingFileHandler, JSONFormatter, QueuedRotatingFileHandler
+
+
+class SlowStream:
+    """
+    File wrapper that sleeps on every write and flush, standing in for a slow disk.
+    """
+
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, data):
+        time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self):
+        time.sleep(self.latency)
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class SlowFileHandler(logging.FileHandler):
+    latency = 0.0
+
+    def _open(self):
+        return SlowStream(super()._open(), self.latency)
+
+
+class SlowBatchRotatingFileHandler(BatchRotatingFileHandler):
+    latency = 0.0
+
+    def _open(self):
+        return SlowStream(super()._open(), self.latency)
+
+
+class SlowQueuedRotatingFileHandler(QueuedRotatingFileHandler):
+    target_class = SlowBatchRotatingFileHandler
+
+
+class Command(BaseCommand):
+    """
+    Django management command comparing synchronous and queued file logging.
+
+    Simulated requests each log a few records, the way the timing middleware
+    and views do. The file handler writes through a stream that sleeps on
+    every write and flush to mimic a slow disk. With logging.FileHandler the
+    sleep lands inside every request; with QueuedRotatingFileHandler the
+    request only enqueues and the listener thread absorbs the latency.
+    """
+    help = 'Measure how log-write latency reaches request latency, synchronous vs queued'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Simulated requests per mode (default: 500)')
+        parser.add_argument('--records', type=int, default=3, help='Log records per request (default: 3)')
+        parser.add_argument('--write-latency', type=float, default=2.0,
+                            help='Milliseconds added to every write and flush (default: 2)')
+
+    def handle(self, *args, **options):
+        """
+        Execute the logging benchmark.
+
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        latency = options['write_latency'] / 1000
+        self.stdout.write(
+            f"{options['requests']} requests x {options['records']} records, "
+            f"{options['write_latency']} ms per write/flush:"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            SlowFileHandler.latency = SlowBatchRotatingFileHandler.latency = latency
+            sync_handler = SlowFileHandler(os.path.join(directory, 'sync.log'), delay=True)
+            self.run_mode('FileHandler', sync_handler, options)
+            queued_handler = SlowQueuedRotatingFileHandler(os.path.join(directory, 'queued.log'))
+            self.run_mode('queued', queued_handler, options)
+
+    def run_mode(self, label, handler, options):
+        handler.setFormatter(JSONFormatter())
+        logger = logging.getLogger(f'vacations.benchmark_logging.{label}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+
+        timings = []
+        try:
+            for index in range(options['requests']):
+                started = time.perf_counter()
+                for record in range(options['records']):
+                    logger.info('request %d record %d', index, record, extra={'path': '/', 'status': 200})
+                timings.append((time.perf_counter() - started) * 1000)
+            drain_started = time.perf_counter()
+            handler.flush()
+            drained = (time.perf_counter() - drain_started) * 1000
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+        timings.sort()
+        self.stdout.write(
+            f'  {label:<12} mean {statistics.mean(timings):7.3f} ms  '
+            f'p50 {percentile(timings, 0.50):7.3f} ms  p99 {percentile(timings, 0.99):7.3f} ms  '
+            f'(backlog written {drained:.0f} ms after the last request)'
+        )
@@ -0,0 +1,82 @@
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+
+CHUNK_SIZE = 64 * 1024
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Command(BaseCommand):
+    """
+    Django management command comparing peak memory of image upload saving.
+    
+    Each strategy runs in a fresh child process (peak RSS only ever grows) on
+    a TemporaryUploadedFile, which is what Django hands the view for uploads
+    larger than FILE_UPLOAD_MAX_MEMORY_SIZE:
+    
+    - buffered: the previous ``default_storage.save(name, ContentFile(image.read()))``
+    - streaming: the current ``storage.save(name, image)``
+    """
+    help = 'Measure peak RSS of saving a large image upload, buffered vs streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=int, default=50, help='Upload size in MB (default: 50)')
+        parser.add_argument(
+            '--mode',
+            choices=['buffered', 'streaming'],
+            help='Run a single strategy in this process instead of comparing both',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Execute the upload memory benchmark.
+        
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        if options['mode']:
+            self.run_mode(options['mode'], options['size_mb'])
+            return
+
+        self.stdout.write(f"Saving a {options['size_mb']} MB upload:")
+        for mode in ('buffered', 'streaming'):
+            result = subprocess.run(
+                [sys.executable, sys.argv[0], 'benchmark_upload',
+                 '--mode', mode, '--size-mb', str(options['size_mb'])],
+                capture_output=True, text=True, check=True,
+            )
+            self.stdout.write(result.stdout.rstrip())
+
+    def run_mode(self, mode, size_mb):
+        with tempfile.TemporaryDirectory() as media_root:
+            storage = FileSystemStorage(location=media_root)
+            upload = TemporaryUploadedFile('large.jpg', 'image/jpeg', size_mb * 1024 * 1024, None)
+            block = os.urandom(CHUNK_SIZE)
+            for _ in range(size_mb * 1024 * 1024 // CHUNK_SIZE):
+                upload.write(block)
+            upload.seek(0)
+
+            before = peak_rss_mb()
+            if mode == 'buffered':
+                storage.save('images/vacation_images/large.jpg', ContentFile(upload.read()))
+            else:
+                storage.save('images/vacation_images/large.jpg', upload)
+            after = peak_rss_mb()
+            upload.close()
+
+        self.stdout.write(
+            f'  {mode:<10} peak RSS {after:7.1f} MB  (+{after - before:.1f} MB while saving)'
+        )
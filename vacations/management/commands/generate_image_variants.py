@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from vacations.cards import invalidate_cards
+from vacations.images import generate_variants
+from vacations.models import Vacation
+
+
+class Command(BaseCommand):
+    """
+    Django management command to backfill resized variants of vacation images.
+    
+    Generates the WebP/JPEG variants used by the responsive card images for
+    every image referenced by a vacation, then drops the affected cached card
+    fragments so the new srcset is picked up.
+    """
+    help = 'Generate resized WebP/JPEG variants for existing vacation images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that already exist',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Execute the variant backfill.
+        
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        images = {}
+        for vacation_id, image_file, updated_at in Vacation.objects.values_list('id', 'image_file', 'updated_at').order_by():
+            images.setdefault(image_file, []).append((vacation_id, updated_at))
+
+        written = 0
+        for image_file, versions in images.items():
+            variants = generate_variants(image_file, force=options['force'])
+            if variants:
+                written += len(variants)
+                self.stdout.write(f'{image_file}: {len(variants)} variant(s)')
+                invalidate_cards(versions)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Wrote {written} variant(s) for {len(images)} image(s)')
+        )
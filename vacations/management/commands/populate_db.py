@@ -1,6 +1,10 @@
-from django.core.management.base import BaseCommand
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.hashers import make_password
-from vacations.models import Role, User, Country, Vacation
+from django.db import connection, transaction
+from vacations import synthetic
+from vacations.models import Role, User, Country, Vacation, Like
 from datetime import date, timedelta
 from django.utils import timezone
 
@@ -14,6 +18,20 @@ class Command(BaseCommand):
     """
     help = 'Populate database with initial data from init_db.sql'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            action='store_true',
+            help='Also generate a large synthetic dataset for load and scaling tests',
+        )
+        parser.add_argument('--users', type=int, default=200_000, help='Synthetic users (default: 200000)')
+        parser.add_argument('--vacations', type=int, default=20_000, help='Synthetic vacations (default: 20000)')
+        parser.add_argument('--likes', type=int, default=2_000_000, help='Synthetic likes, approximately (default: 2000000)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data (default: 42)')
+        parser.add_argument('--zipf', type=float, default=1.1, help='Exponent of the like popularity curve (default: 1.1)')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per insert batch (default: 10000)')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL')
+
     def handle(self, *args, **options):
         """
         Execute the database population process.
@@ -201,4 +219,67 @@ class Command(BaseCommand):
         self.stdout.write('Created vacations')
         self.stdout.write(
             self.style.SUCCESS('Successfully populated database with initial data!')
-        )
\ No newline at end of file
+        )
+
+        if options['scale']:
+            self.populate_scale(user_role, list(countries.values()), options)
+
+    def populate_scale(self, user_role, countries, options):
+        """
+        Generate the synthetic dataset in one transaction.
+        
+        Users share a single precomputed password hash (``scale123``), since
+        hashing each one would take hours. Likes follow a Zipf-like curve over
+        vacations, and each vacation's like_count is written with the row.
+        
+        Args:
+            user_role: Role given to every synthetic user
+            countries: Countries to spread vacations over
+            options: Parsed command options
+        """
+        email_prefix = f"scale-{options['seed']}-"
+        if User.objects.filter(email=f'{email_prefix}0@example.com').exists():
+            raise CommandError(f"Synthetic data for seed {options['seed']} already exists")
+        if options['users'] < 1 or options['vacations'] < 1:
+            raise CommandError('--users and --vacations must be positive')
+
+        rng = random.Random(options['seed'])
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        batch_size = options['batch_size']
+        now = timezone.now()
+        started = time.perf_counter()
+        self.stdout.write(f"Generating synthetic data with seed {options['seed']} ({'COPY' if use_copy else 'bulk_create'})...")
+
+        with transaction.atomic():
+            last_user_id = User.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+            count = synthetic.insert_rows(
+                User, synthetic.USER_FIELDS,
+                synthetic.generate_users(rng, options['users'], email_prefix, make_password('scale123'), user_role.pk, now),
+                batch_size, use_copy,
+            )
+            user_ids = list(User.objects.filter(pk__gt=last_user_id).order_by('pk').values_list('pk', flat=True))
+            self.stdout.write(f'  {count} users ({time.perf_counter() - started:.1f}s)')
+
+            like_counts = synthetic.zipf_like_counts(options['vacations'], options['likes'], len(user_ids), options['zipf'])
+            # Spread popularity ranks so the most liked vacations are not all the first rows
+            rng.shuffle(like_counts)
+            last_vacation_id = Vacation.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+            count = synthetic.insert_rows(
+                Vacation, synthetic.VACATION_FIELDS,
+                synthetic.generate_vacations(rng, like_counts, [country.pk for country in countries], now.date(), now),
+                batch_size, use_copy,
+            )
+            vacation_ids = list(Vacation.objects.filter(pk__gt=last_vacation_id).order_by('pk').values_list('pk', flat=True))
+            self.stdout.write(f'  {count} vacations ({time.perf_counter() - started:.1f}s)')
+
+            count = synthetic.insert_rows(
+                Like, synthetic.LIKE_FIELDS,
+                synthetic.generate_likes(rng, vacation_ids, like_counts, user_ids, now),
+                batch_size, use_copy,
+            )
+            self.stdout.write(f'  {count} likes ({time.perf_counter() - started:.1f}s)')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(self.style.SUCCESS(f'Generated synthetic data in {time.perf_counter() - started:.1f}s'))
\ No newline at end of file
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from vacations.profiling import hot_functions, issue_profile_token, read_collapsed
+
+
+class Command(BaseCommand):
+    """
+    Django management command summarising profiles written by ProfilingMiddleware.
+
+    Merges the collapsed-stack files of every URL name (or the ones given)
+    and lists the functions with the most samples. ``--output`` also saves
+    the merged stacks for flamegraph.pl or speedscope.
+    """
+    help = 'Report the hottest functions in sampled request profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url_names', nargs='*', help='URL names to include (default: all)')
+        parser.add_argument('--dir', default=None, help='Profile directory (default: PROFILING_DIR)')
+        parser.add_argument('--top', type=int, default=20, help='Functions to list (default: 20)')
+        parser.add_argument('--sort', choices=['self', 'total'], default='self',
+                            help='Rank by samples spent in the function itself or anywhere below it')
+        parser.add_argument('--output', help='Write the merged collapsed stacks to this file')
+        parser.add_argument('--issue-token', action='store_true',
+                            help='Print a signed X-Profile header value and exit')
+
+    def handle(self, *args, **options):
+        """
+        Execute the report.
+
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        if options['issue_token']:
+            self.stdout.write(f'X-Profile: {issue_profile_token()}')
+            return
+
+        root = Path(options['dir'] or settings.PROFILING_DIR)
+        if not root.is_dir():
+            raise CommandError(f'No profiles in {root}')
+        directories = [root / name.replace(':', '.') for name in options['url_names']] or sorted(
+            path for path in root.iterdir() if path.is_dir()
+        )
+
+        files = [path for directory in directories for path in sorted(directory.glob('*.folded'))]
+        if not files:
+            raise CommandError(f'No profiles in {root} for {", ".join(options["url_names"]) or "any URL"}')
+        stacks = read_collapsed(files)
+        samples = sum(stacks.values())
+
+        self.stdout.write(f'{samples} samples from {len(files)} requests ({", ".join(d.name for d in directories)})')
+        self_samples, total_samples = hot_functions(stacks)
+        ranking = self_samples if options['sort'] == 'self' else total_samples
+        self.stdout.write(f"{'self':>7} {'total':>7}  function")
+        for function, _ in ranking.most_common(options['top']):
+            self.stdout.write(
+                f'{self_samples[function] / samples:7.1%} {total_samples[function] / samples:7.1%}  {function}'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.writelines(f'{stack} {count}\n' for stack, count in stacks.most_common())
+            self.stdout.write(f"Saved merged stacks to {options['output']}")
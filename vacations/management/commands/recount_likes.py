@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from vacations.models import Vacation
+
+
+class Command(BaseCommand):
+    """
+    Django management command to repair denormalized vacation like counts.
+    
+    Recomputes Vacation.like_count from the likes table and rewrites the
+    vacations whose stored value drifted, in a single bulk UPDATE.
+    """
+    help = 'Recompute Vacation.like_count from the likes table and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted vacations without changing them',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Execute the like count repair.
+        
+        Args:
+            *args: Variable length argument list
+            **options: Arbitrary keyword arguments
+        """
+        if options['dry_run']:
+            drifted = Vacation.objects.recount_likes(dry_run=True)
+            self.stdout.write(f'{drifted} vacation(s) have a drifted like count')
+            return
+
+        repaired = Vacation.objects.recount_likes()
+        self.stdout.write(
+            self.style.SUCCESS(f'Repaired like count for {repaired} vacation(s)')
+        )
@@ -0,0 +1,171 @@
+import mimetypes
+import os
+import re
+import stat
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .images import is_content_addressed
+
+MEDIA_SERVING_MODES = ('django', 'x-accel', 'x-sendfile')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def media_cache_control(path: str) -> str:
+    """
+    Cache-Control value for a media file.
+
+    Hash-named files never change, so browsers may keep them for a year
+    without revalidating. Other names can be overwritten and get a short
+    max-age instead.
+    """
+    if is_content_addressed(path):
+        return 'public, max-age=31536000, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range`` header into inclusive byte offsets.
+
+    Multiple ranges are not supported and are treated like a missing header,
+    which RFC 9110 allows (the full file is sent with 200).
+
+    Args:
+        header: Value of the Range request header
+        size: Size of the file in bytes
+
+    Returns:
+        Optional[Tuple[int, int]]: (first, last) offsets, None to send the
+        whole file, or (size, size) when the range cannot be satisfied
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return size, size
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        if first >= size:
+            return size, size
+        return None
+    return first, last
+
+
+def iter_range(path: str, first: int, last: int):
+    with open(path, 'rb') as handle:
+        handle.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = handle.read(min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def if_range_matches(request, etag: str, last_modified: int) -> bool:
+    """
+    Whether a Range request may be honoured under its If-Range precondition.
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a file from MEDIA_ROOT with validators, caching and byte ranges.
+
+    With ``MEDIA_SERVING_MODE`` set to ``x-accel`` (nginx) or ``x-sendfile``
+    (Apache, lighttpd) the view only checks the path and answers with a header
+    telling the front server which file to send, so the worker is freed at
+    once and the front server handles ranges itself. The default ``django``
+    mode streams the file with FileResponse, which uses the server's
+    ``wsgi.file_wrapper`` (sendfile) where available, and answers Range
+    requests with 206.
+
+    Args:
+        request: HTTP request object
+        path: File path relative to MEDIA_ROOT
+
+    Returns:
+        HttpResponse: The file, a partial file, 304, 416 or an offload response
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        file_stat = os.stat(full_path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404('Media file not found')
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404('Media file not found')
+
+    size = file_stat.st_size
+    last_modified = int(file_stat.st_mtime)
+    etag = f'"{size:x}-{file_stat.st_mtime_ns:x}"'
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        mode = settings.MEDIA_SERVING_MODE
+        if mode == 'x-accel':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + quote(path)
+        elif mode == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = build_file_response(request, full_path, size, content_type, etag, last_modified)
+        if encoding:
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = media_cache_control(path)
+    return response
+
+
+def build_file_response(request, full_path, size, content_type, etag, last_modified) -> HttpResponse:
+    """
+    In-process response for the ``django`` serving mode, honouring Range.
+    """
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.method == 'GET' and if_range_matches(request, etag, last_modified):
+        byte_range = parse_range(range_header, size)
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    elif byte_range[0] >= size:
+        response = HttpResponse(status=416, content_type=content_type)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(iter_range(full_path, first, last), status=206, content_type=content_type)
+        response['Content-Length'] = str(last - first + 1)
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,99 @@
+"""
+Prometheus metrics for the vacation app.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory before the workers start: every process then keeps its values in
+memory-mapped files there, and a scrape of any worker aggregates all of them.
+Clear the directory on deploy, and call
+``prometheus_client.multiprocess.mark_process_dead(worker.pid)`` from the
+server's worker-exit hook (gunicorn: ``child_exit``) so live gauges drop
+exited workers.
+"""
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+
+# Anything else in the method label is counted as "other", so arbitrary
+# methods sent by clients cannot create new series
+REQUEST_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+REQUESTS = Counter(
+    'vacations_requests_total', 'HTTP requests by URL name, method and status',
+    ['view', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'vacations_request_duration_seconds', 'Time spent in the middleware chain by URL name',
+    ['view'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LIKE_TOGGLES = Counter(
+    'vacations_like_toggles_total', 'Like toggles by resulting state',
+    ['action'],
+)
+LOGIN_ATTEMPTS = Counter(
+    'vacations_login_attempts_total', 'Login POSTs by outcome',
+    ['result'],
+)
+UPLOAD_BYTES = Counter(
+    'vacations_upload_bytes_total', 'Bytes of vacation images accepted for storage',
+)
+CACHE_LOOKUPS = Counter(
+    'vacations_cache_lookups_total', 'Application cache lookups by cache and result',
+    ['cache', 'result'],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'vacations_db_pool_connections', 'Database pool connections by state (DB_POOL only)',
+    ['alias', 'state'],
+    multiprocess_mode='livesum',
+)
+HASHING_POOL = Gauge(
+    'vacations_password_hashing_tasks', 'Password hashes running or waiting on the hashing pool',
+    ['state'],
+    multiprocess_mode='livesum',
+)
+# Exported at 0 before the first login rather than missing
+HASHING_POOL.labels('running')
+HASHING_POOL.labels('queued')
+
+
+def method_label(method: str) -> str:
+    return method if method in REQUEST_METHODS else 'other'
+
+
+def count_cache_lookups(cache_name: str, hits: int, misses: int) -> None:
+    if hits:
+        CACHE_LOOKUPS.labels(cache_name, 'hit').inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache_name, 'miss').inc(misses)
+
+
+def update_pool_gauges(alias: str, pool) -> None:
+    """
+    Copy a connection pool's occupancy into the gauges.
+
+    Called by the vacations.db.postgresql backend whenever it checks a
+    connection out of the pool or returns one, so every process's values stay
+    current between scrapes.
+
+    Args:
+        alias: Database alias the pool belongs to
+        pool: The alias's psycopg_pool.ConnectionPool
+    """
+    stats = pool.get_stats()
+    DB_POOL_CONNECTIONS.labels(alias, 'size').set(stats.get('pool_size', 0))
+    DB_POOL_CONNECTIONS.labels(alias, 'available').set(stats.get('pool_available', 0))
+    DB_POOL_CONNECTIONS.labels(alias, 'waiting').set(stats.get('requests_waiting', 0))
+
+
+def render_metrics() -> bytes:
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        bytes: Exposition of this process, or of all processes in multiprocess mode
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
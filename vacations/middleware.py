@@ -1,19 +1,236 @@
 import logging
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.exceptions import MiddlewareNotUsed
 from django.http import HttpResponse
+from django.utils.functional import SimpleLazyObject
 
+from . import metrics, profiling, querystats, user_snapshots
+from .instrumentation import record_request
 
-class SuppressWellKnownMiddleware:
+logger = logging.getLogger(__name__)
+
+
+class AsyncCapableMiddleware:
     """
-    Middleware to suppress Chrome DevTools .well-known requests
+    Base for middleware with native sync and async code paths.
+    
+    Under ASGI Django hands async-capable middleware an async get_response, so
+    the request stays on the event loop instead of hopping to a thread at this
+    layer. Subclasses implement ``handle`` (sync) and ``ahandle`` (async).
     """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
-
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
     def __call__(self, request):
+        if self.async_mode:
+            return self.ahandle(request)
+        return self.handle(request)
+    
+    def handle(self, request):
+        raise NotImplementedError
+    
+    async def ahandle(self, request):
+        raise NotImplementedError
+
+
+class SuppressWellKnownMiddleware(AsyncCapableMiddleware):
+    """
+    Middleware to suppress Chrome DevTools .well-known requests
+    """
+    
+    def handle(self, request):
         # Suppress Chrome DevTools requests silently
         if request.path.startswith('/.well-known/'):
             return HttpResponse(status=404)
         
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+    
+    async def ahandle(self, request):
+        if request.path.startswith('/.well-known/'):
+            return HttpResponse(status=404)
+        return await self.get_response(request)
+
+
+class SnapshotAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware that can resolve request.user from a cached snapshot.
+    
+    With USER_SNAPSHOT_AUTH off this behaves exactly like Django's middleware.
+    With it on, authenticated requests skip the user query while the user's
+    snapshot is cached (see vacations.user_snapshots).
+    """
+    
+    def process_request(self, request):
+        super().process_request(request)
+        if not settings.USER_SNAPSHOT_AUTH:
+            return
+        
+        def get_user():
+            if not hasattr(request, '_cached_user'):
+                request._cached_user = user_snapshots.get_user(request)
+            return request._cached_user
+        
+        async def auser():
+            return await sync_to_async(get_user)()
+        
+        request.user = SimpleLazyObject(get_user)
+        request.auser = auser
+
+
+class RequestTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Measure sampled requests and report them via Server-Timing and the log.
+    
+    A REQUEST_TIMING_SAMPLE_RATE share of requests records its query count,
+    DB time, template render time and total time. The figures go into a
+    Server-Timing header (shown in the browser's network panel) and into one
+    structured log line. Other requests pass straight through.
+    """
+    
+    def sampled(self) -> bool:
+        rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+    
+    def handle(self, request):
+        if not self.sampled():
+            return self.get_response(request)
+        
+        started = time.perf_counter()
+        with record_request() as timings:
+            response = self.get_response(request)
+        return self.report(request, response, timings, time.perf_counter() - started)
+    
+    async def ahandle(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        
+        started = time.perf_counter()
+        with record_request() as timings:
+            response = await self.get_response(request)
+        return self.report(request, response, timings, time.perf_counter() - started)
+    
+    def report(self, request, response, timings, total):
+        response['Server-Timing'] = timings.server_timing(total)
+        logger.info(
+            'request_timing method=%s path=%s status=%s total_ms=%.2f db_ms=%.2f queries=%d template_ms=%.2f',
+            request.method, request.path, response.status_code,
+            total * 1000, timings.db_seconds * 1000, timings.queries, timings.template_seconds * 1000,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'db_ms': round(timings.db_seconds * 1000, 2),
+                'queries': timings.queries,
+                'template_ms': round(timings.template_seconds * 1000, 2),
+            },
+        )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Sample the Python stack of selected requests and save it per URL name.
+    
+    Opt-in with PROFILING_ENABLED. A PROFILING_SAMPLE_RATE share of requests
+    is profiled, plus any request carrying a signed X-Profile header (see
+    ``profile_report --issue-token``). Stacks are written as collapsed-stack
+    files under PROFILING_DIR/<url name>/ for ``profile_report`` or
+    flamegraph.pl.
+    
+    The sampler follows one thread, so this middleware stays sync-only: under
+    ASGI, Django runs it (and what it calls) in a worker thread while enabled.
+    """
+    
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        rate = settings.PROFILING_SAMPLE_RATE
+        sampled = rate > 0 and (rate >= 1 or random.random() < rate)
+        if not sampled and not profiling.has_profile_token(request):
+            return self.get_response(request)
+        
+        sampler = profiling.StackSampler(settings.PROFILING_INTERVAL).start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        
+        match = request.resolver_match
+        url_name = (match.view_name if match else None) or 'unresolved'
+        try:
+            profiling.write_collapsed(settings.PROFILING_DIR, url_name, stacks)
+        except OSError as exc:
+            logger.warning('Cannot write profile for %s: %s', url_name, exc)
+        return response
+
+
+class QueryStatsMiddleware(AsyncCapableMiddleware):
+    """
+    Attribute the request's queries to its URL name in the query statistics.
+    
+    Queries run before URL resolution (session and user lookups in earlier
+    middleware) count under the view too when they happen lazily inside it;
+    anything else is recorded under ``<none>``.
+    """
+    
+    def __init__(self, get_response):
+        if not settings.QUERY_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+    
+    def handle(self, request):
+        token = querystats.set_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            querystats.reset_request(token)
+    
+    async def ahandle(self, request):
+        token = querystats.set_request(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            querystats.reset_request(token)
+
+
+class PrometheusMiddleware(AsyncCapableMiddleware):
+    """
+    Count requests and record their latency per URL name for /metrics/.
+    """
+    
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+    
+    def handle(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        return self.observe(request, response, time.perf_counter() - started)
+    
+    async def ahandle(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self.observe(request, response, time.perf_counter() - started)
+    
+    def observe(self, request, response, elapsed):
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or 'unresolved'
+        metrics.REQUESTS.labels(view_name, metrics.method_label(request.method), str(response.status_code)).inc()
+        metrics.REQUEST_LATENCY.labels(view_name).observe(elapsed)
+        return response
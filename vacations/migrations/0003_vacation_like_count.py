@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:14
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_like_counts(apps, schema_editor):
+    Vacation = apps.get_model('vacations', 'Vacation')
+    Like = apps.get_model('vacations', 'Like')
+    actual = (
+        Like.objects.filter(vacation=OuterRef('pk'))
+        .order_by()
+        .values('vacation')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Vacation.objects.update(
+        like_count=Coalesce(Subquery(actual, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacations', '0002_alter_user_managers_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vacation',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_like_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacations', '0003_vacation_like_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vacation',
+            index=models.Index(fields=['start_date', 'id'], name='vacations_start_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacations', '0004_vacation_start_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='vacation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vacations', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vacation',
+            name='image_file',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -1,9 +1,51 @@
-from typing import Optional, Any, Dict
-from django.db import models
+import time
+from asgiref.sync import sync_to_async
+from typing import Optional, Any, Dict, Tuple
+from django.db import connections, models, router, transaction
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import MinValueValidator, MaxValueValidator, MinLengthValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from .metrics import count_cache_lookups
+from .signals import like_toggled
+
+
+class RoleManager(models.Manager):
+    """
+    Manager with an in-process cache of the roles table.
+    
+    There are only a couple of roles and they almost never change, so each
+    process keeps all of them in memory. Saving or deleting a role clears
+    the cache of the process that made the change; other processes pick the
+    change up once CACHE_TIMEOUT seconds have passed.
+    """
+    CACHE_TIMEOUT = 300
+    _roles: Optional[Dict[int, 'Role']] = None
+    _loaded_at = 0.0
+    
+    def get_cached(self, pk: int) -> Optional['Role']:
+        """
+        Look up a role by primary key without a query while the cache is fresh.
+        
+        Args:
+            pk: Primary key of the role
+            
+        Returns:
+            Optional[Role]: The role, or None if no such role exists
+        """
+        roles = RoleManager._roles
+        if roles is None or pk not in roles or time.monotonic() - RoleManager._loaded_at > self.CACHE_TIMEOUT:
+            count_cache_lookups('role', 0, 1)
+            roles = {role.pk: role for role in self.get_queryset()}
+            RoleManager._roles, RoleManager._loaded_at = roles, time.monotonic()
+        else:
+            count_cache_lookups('role', 1, 0)
+        return roles.get(pk)
+    
+    def clear_cache(self) -> None:
+        RoleManager._roles = None
 
 
 class Role(models.Model):
@@ -24,6 +66,8 @@ class Role(models.Model):
         unique=True
     )
     
+    objects = RoleManager()
+    
     def __str__(self) -> str:
         return self.role_name
     
@@ -82,7 +126,11 @@ class User(AbstractUser):
     
     @property
     def is_admin(self) -> bool:
-        return self.role.role_name == 'admin'
+        # Prefer a role loaded with the user (select_related), else the role cache
+        if User.role.is_cached(self):
+            return self.role.role_name == 'admin'
+        role = Role.objects.get_cached(self.role_id) or self.role
+        return role.role_name == 'admin'
     
     class Meta:
         db_table = 'users'
@@ -105,6 +153,59 @@ class Country(models.Model):
         verbose_name_plural = 'countries'
 
 
+class VacationQuerySet(models.QuerySet):
+    """
+    Query helpers for vacation package listings.
+    
+    Loads everything a vacation card needs in a single query so list pages
+    issue a fixed number of queries regardless of catalogue size.
+    """
+    def with_like_info(self, user) -> 'VacationQuerySet':
+        """
+        Annotate vacations with the given user's like flag.
+        
+        Like totals come from the denormalized ``like_count`` column, so only
+        the per-user flag needs a subquery.
+        
+        Args:
+            user: User whose like status should be reported (may be anonymous)
+            
+        Returns:
+            VacationQuerySet: Vacations with country and ``user_liked`` loaded up front
+        """
+        if user.is_authenticated:
+            user_liked = Exists(Like.objects.filter(vacation=OuterRef('pk'), user=user))
+        else:
+            user_liked = Value(False)
+        return self.select_related('country').annotate(user_liked=user_liked)
+    
+    def recount_likes(self, dry_run: bool = False) -> int:
+        """
+        Repair ``like_count`` values that drifted from the likes table.
+        
+        Counts are recomputed with a correlated subquery and only drifted rows
+        are rewritten, in a single UPDATE statement.
+        
+        Args:
+            dry_run: Only report how many vacations drifted
+            
+        Returns:
+            int: Number of vacations whose stored count was (or would be) wrong
+        """
+        actual = (
+            Like.objects.filter(vacation=OuterRef('pk'))
+            .order_by()
+            .values('vacation')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        counted = Coalesce(Subquery(actual, output_field=IntegerField()), 0)
+        drifted = self.annotate(actual_likes=counted).exclude(like_count=F('actual_likes'))
+        if dry_run:
+            return drifted.count()
+        return self.filter(pk__in=drifted.values('pk')).update(like_count=counted)
+
+
 class Vacation(models.Model):
     """
     Vacation package model containing all vacation details.
@@ -113,10 +214,12 @@ class Vacation(models.Model):
     dates, pricing, and image information. Includes validation for
     logical date ranges and pricing constraints.
     """
+    # Indexed as the leading column of vacations_country_start_idx instead
     country = models.ForeignKey(
         Country, 
         on_delete=models.CASCADE,
-        related_name='vacations'
+        related_name='vacations',
+        db_index=False
     )
     description = models.TextField()
     start_date = models.DateField()
@@ -126,7 +229,15 @@ class Vacation(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(0), MaxValueValidator(10000)]
     )
-    image_file = models.CharField(max_length=255)
+    # Indexed because it doubles as the reference count of stored images
+    image_file = models.CharField(max_length=255, db_index=True)
+    # Denormalized from the likes table; kept in step by Like.objects.toggle
+    # and repairable with the recount_likes management command
+    like_count = models.PositiveIntegerField(default=0)
+    # Indexed so MAX(updated_at) for conditional GET validators is an index lookup
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    objects = VacationQuerySet.as_manager()
     
     def clean(self):
         if self.start_date and self.end_date:
@@ -139,12 +250,15 @@ class Vacation(models.Model):
     
     def save(self, *args, **kwargs):
         self.full_clean()
+        # like_count only changes through atomic F() updates, so an edit of an
+        # existing vacation must never write back a stale copy of it
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'like_count'
+            ]
         super().save(*args, **kwargs)
     
-    @property
-    def like_count(self) -> int:
-        return self.likes.count()
-    
     def is_liked_by_user(self, user) -> bool:
         if user.is_authenticated:
             return self.likes.filter(user=user).exists()
@@ -156,6 +270,102 @@ class Vacation(models.Model):
     class Meta:
         db_table = 'vacations'
         ordering = ['start_date']
+        indexes = [
+            # Backs keyset pagination over (start_date, id)
+            models.Index(fields=['start_date', 'id'], name='vacations_start_id_idx'),
+            # Backs the admin's country filter, which keeps the start_date ordering
+            models.Index(fields=['country', 'start_date'], name='vacations_country_start_idx'),
+        ]
+
+
+class LikeManager(models.Manager):
+    """
+    Manager for user likes with a race-free toggle operation.
+    
+    On PostgreSQL the toggle is a single statement: a DELETE ... RETURNING,
+    a conditional INSERT ... ON CONFLICT DO NOTHING and the like_count update
+    run as data-modifying CTEs. Other databases use a short transaction that
+    starts with a write so concurrent toggles serialize.
+    """
+    TOGGLE_SQL = """
+        WITH removed AS (
+            DELETE FROM {likes} WHERE user_id = %(user_id)s AND vacation_id = %(vacation_id)s
+            RETURNING 1
+        ), added AS (
+            INSERT INTO {likes} (user_id, vacation_id, updated_at)
+            SELECT %(user_id)s, id, NOW() FROM {vacations}
+            WHERE id = %(vacation_id)s AND NOT EXISTS (SELECT 1 FROM removed)
+            ON CONFLICT (user_id, vacation_id) DO NOTHING
+            RETURNING 1
+        )
+        UPDATE {vacations}
+        SET like_count = like_count + (SELECT COUNT(*) FROM added) - (SELECT COUNT(*) FROM removed)
+        WHERE id = %(vacation_id)s
+        RETURNING NOT EXISTS (SELECT 1 FROM removed), like_count
+    """
+    
+    def toggle(self, user, vacation_id: int) -> Optional[Tuple[bool, int]]:
+        """
+        Like or unlike a vacation on behalf of a user.
+        
+        Args:
+            user: User toggling the like
+            vacation_id: ID of the vacation package
+            
+        Returns:
+            Optional[Tuple[bool, int]]: New liked state and like count, or
+            None if the vacation does not exist
+        """
+        using = router.db_for_write(self.model)
+        if connections[using].vendor == 'postgresql':
+            result = self._toggle_postgresql(using, user.pk, vacation_id)
+        else:
+            result = self._toggle_portable(using, user.pk, vacation_id)
+        
+        if result is not None:
+            liked, like_count = result
+            like_toggled.send(
+                sender=self.model,
+                user_id=user.pk,
+                vacation_id=vacation_id,
+                liked=liked,
+                like_count=like_count,
+            )
+        return result
+    
+    async def atoggle(self, user, vacation_id: int) -> Optional[Tuple[bool, int]]:
+        """
+        Async version of ``toggle``.
+        
+        The portable toggle is a transaction, which Django only runs on one
+        thread, so the whole toggle runs as a single sync_to_async call.
+        """
+        return await sync_to_async(self.toggle)(user, vacation_id)
+    
+    def _toggle_postgresql(self, using: str, user_id: int, vacation_id: int) -> Optional[Tuple[bool, int]]:
+        sql = self.TOGGLE_SQL.format(
+            likes=self.model._meta.db_table,
+            vacations=Vacation._meta.db_table,
+        )
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, {'user_id': user_id, 'vacation_id': vacation_id})
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return bool(row[0]), row[1]
+    
+    def _toggle_portable(self, using: str, user_id: int, vacation_id: int) -> Optional[Tuple[bool, int]]:
+        vacations = Vacation.objects.using(using).filter(pk=vacation_id)
+        with transaction.atomic(using=using):
+            # A no-op write takes the row (or database) write lock up front
+            if not vacations.update(like_count=F('like_count')):
+                return None
+            removed, _ = self.using(using).filter(user_id=user_id, vacation_id=vacation_id).delete()
+            if not removed:
+                self.using(using).create(user_id=user_id, vacation_id=vacation_id)
+            vacations.update(like_count=F('like_count') + (-1 if removed else 1))
+            like_count = vacations.values_list('like_count', flat=True).get()
+        return not removed, like_count
 
 
 class Like(models.Model):
@@ -165,16 +375,22 @@ class Like(models.Model):
     Tracks which users have 'liked' specific vacation packages.
     Enforces unique constraint to prevent duplicate likes from the same user.
     """
+    # Lookups by user (liked checks) use the unique (user, vacation) index;
+    # lookups by vacation (counts, cascades) use the vacation foreign key index
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE,
-        related_name='likes'
+        related_name='likes',
+        db_index=False
     )
     vacation = models.ForeignKey(
         Vacation, 
         on_delete=models.CASCADE,
         related_name='likes'
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = LikeManager()
     
     def __str__(self) -> str:
         return f"{self.user} likes {self.vacation.country.country_name}"
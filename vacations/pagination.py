@@ -0,0 +1,105 @@
+import base64
+import binascii
+from datetime import date
+from typing import List, Optional, Tuple
+
+from django.core.exceptions import BadRequest
+from django.db.models import Q, QuerySet
+
+# Largest value of a BigAutoField; a bigger pk would overflow the query parameter
+MAX_PK = 2 ** 63 - 1
+
+
+def encode_cursor(start_date: date, pk: int) -> str:
+    """
+    Encode a vacation's (start_date, id) sort key as an opaque URL-safe cursor.
+    """
+    raw = f"{start_date.isoformat()}:{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        BadRequest: If the cursor is malformed or its id is out of range
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start_date, pk = base64.urlsafe_b64decode(padded).decode().split(':')
+        start_date, pk = date.fromisoformat(start_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest('Invalid page cursor')
+    if not 1 <= pk <= MAX_PK:
+        raise BadRequest('Invalid page cursor')
+    return start_date, pk
+
+
+class KeysetPage:
+    """
+    One page of vacations fetched by keyset (seek) pagination.
+
+    Pages are ordered by (start_date, id) and each page starts strictly after
+    the previous page's last row, so the database seeks straight to it through
+    the composite index instead of scanning and discarding an OFFSET.
+    """
+    def __init__(self, items: List, next_cursor: Optional[str]):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def keyset_queryset(queryset: QuerySet, cursor: Optional[str]) -> QuerySet:
+    """
+    Order a vacation queryset by (start_date, id) and seek past the cursor.
+
+    The ``start_date >= ...`` bound is implied by the OR that follows it, but
+    spelling it out gives the planner an index condition on
+    vacations_start_id_idx instead of a filter over an index scan.
+    """
+    queryset = queryset.order_by('start_date', 'id')
+    if cursor:
+        start_date, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(start_date__gt=start_date) | Q(start_date=start_date, id__gt=pk),
+            start_date__gte=start_date,
+        )
+    return queryset
+
+
+def paginate_vacations(queryset: QuerySet, cursor: Optional[str], page_size: int) -> KeysetPage:
+    """
+    Fetch the page of vacations that follows the given cursor.
+
+    Args:
+        queryset: Vacation queryset to paginate (filters and annotations are kept)
+        cursor: Cursor of the previous page's last row, or None for the first page
+        page_size: Number of vacations per page
+
+    Returns:
+        KeysetPage: Page items and the cursor for the following page
+    """
+    # One extra row tells us whether another page exists
+    items = list(keyset_queryset(queryset, cursor)[:page_size + 1])
+    return build_page(items, page_size)
+
+
+async def apaginate_vacations(queryset: QuerySet, cursor: Optional[str], page_size: int) -> KeysetPage:
+    """
+    Async version of ``paginate_vacations``.
+    """
+    items = [item async for item in keyset_queryset(queryset, cursor)[:page_size + 1]]
+    return build_page(items, page_size)
+
+
+def build_page(items: List, page_size: int) -> KeysetPage:
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(last.start_date, last.pk)
+    return KeysetPage(items, next_cursor)
@@ -0,0 +1,144 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core import signing
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+TOKEN_SALT = 'vacations.profiling'
+
+
+def issue_profile_token() -> str:
+    """
+    Create a value for the X-Profile header that forces a request to be profiled.
+
+    Returns:
+        str: Signed token, valid for PROFILING_TOKEN_MAX_AGE seconds
+    """
+    return signing.dumps('profile', salt=TOKEN_SALT)
+
+
+def has_profile_token(request) -> bool:
+    token = request.META.get(PROFILE_HEADER)
+    if not token:
+        return False
+    try:
+        signing.loads(token, salt=TOKEN_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=4096)
+def frame_label(code) -> str:
+    """
+    Name a code object as ``function (module/file.py:line)`` for collapsed stacks.
+    """
+    path = code.co_filename
+    for prefix in (str(settings.BASE_DIR), *sys.path):
+        if prefix and path.startswith(prefix + os.sep):
+            path = path[len(prefix) + 1:]
+            break
+    # ';' separates frames in the collapsed format
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'.replace(';', ':')
+
+
+class StackSampler:
+    """
+    Sample one thread's Python stack at a fixed interval from a background thread.
+
+    Samples accumulate as collapsed stacks (root first, frames joined by
+    ``;``) with a count each, the input format of flamegraph.pl and
+    speedscope. Unlike cProfile the profiled thread runs untraced, so the
+    overhead stays small and does not skew the fast functions.
+    """
+
+    def __init__(self, interval: float, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        # A sample taken while stop() joins would only show the join
+        if labels and not self._stop.is_set():
+            self.stacks[';'.join(reversed(labels))] += 1
+
+
+def write_collapsed(directory, url_name: str, stacks: Dict[str, int]) -> Optional[Path]:
+    """
+    Write one request's stacks to ``<directory>/<url_name>/<time>-<pid>.folded``.
+
+    Args:
+        directory: Profile root directory
+        url_name: Resolved URL name the request was served by
+        stacks: Collapsed stack to sample count
+
+    Returns:
+        Optional[Path]: File written, or None when there were no samples
+    """
+    if not stacks:
+        return None
+    target = Path(directory) / url_name.replace(':', '.').replace(os.sep, '_')
+    target.mkdir(parents=True, exist_ok=True)
+    path = target / f'{time.time_ns()}-{os.getpid()}.folded'
+    path.write_text(''.join(f'{stack} {count}\n' for stack, count in stacks.items()))
+    return path
+
+
+def read_collapsed(paths: Iterable[Path]) -> Counter:
+    """
+    Merge collapsed-stack files, summing the counts of identical stacks.
+    """
+    stacks = Counter()
+    for path in paths:
+        with open(path) as handle:
+            for line in handle:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if stack and count.isdigit():
+                    stacks[stack] += int(count)
+    return stacks
+
+
+def hot_functions(stacks: Dict[str, int]):
+    """
+    Count samples per function.
+
+    Returns:
+        tuple: (self samples, total samples) Counters keyed by frame label; a
+        function's self samples are those where it was running, its total
+        samples those where it was anywhere on the stack
+    """
+    self_samples = Counter()
+    total_samples = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        self_samples[frames[-1]] += count
+        for frame in set(frames):
+            total_samples[frame] += count
+    return self_samples, total_samples
@@ -0,0 +1,144 @@
+import functools
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_FINGERPRINT = '<other>'
+NO_VIEW = '<none>'
+
+# Request being served; its URL name is read once URL resolution has run
+_request: ContextVar[Optional[object]] = ContextVar('vacations_query_request', default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\bIN \(\?(?:, \?)*\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'VALUES \((?:\?, )*\?\)(?:, \((?:\?, )*\?\))+', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> str:
+    """
+    Reduce SQL to its shape, so queries that differ only in values group together.
+
+    String and number literals and parameter placeholders become ``?``;
+    ``IN (...)`` lists and multi-row ``VALUES`` collapse to one entry.
+
+    Args:
+        sql: SQL as passed to the cursor
+
+    Returns:
+        str: Normalised statement
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_RE.sub('VALUES (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class QueryStats:
+    """
+    Per-process count, total time and max time of queries by (view, fingerprint).
+
+    Distinct fingerprints are capped at QUERY_STATS_MAX_FINGERPRINTS; further
+    shapes are counted under ``<other>`` so memory stays bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, view_name: str, sql_fingerprint: str, seconds: float):
+        with self._lock:
+            key = (view_name, sql_fingerprint)
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= settings.QUERY_STATS_MAX_FINGERPRINTS:
+                    key = (view_name, OVERFLOW_FINGERPRINT)
+                    entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def snapshot(self) -> List[dict]:
+        """
+        Copy the aggregates, highest total time first.
+
+        Returns:
+            List[dict]: One entry per view and fingerprint with count, total_ms, max_ms and mean_ms
+        """
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self._entries.items()]
+        items.sort(key=lambda item: item[1][1], reverse=True)
+        return [
+            {
+                'view': view_name,
+                'fingerprint': sql_fingerprint,
+                'count': count,
+                'total_ms': round(total * 1000, 3),
+                'max_ms': round(longest * 1000, 3),
+                'mean_ms': round(total * 1000 / count, 3),
+            }
+            for (view_name, sql_fingerprint), (count, total, longest) in items
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+query_stats = QueryStats()
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute_wrapper that times each query into ``query_stats``.
+
+    Queries slower than SLOW_QUERY_MS are also logged with the view name.
+    """
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        view_name = current_view_name()
+        query_stats.record(view_name, fingerprint(sql), elapsed)
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, view_name, sql,
+                           extra={'view': view_name, 'duration_ms': round(elapsed * 1000, 2)})
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver adding ``record_query`` to every new connection.
+    """
+    if settings.QUERY_STATS_ENABLED and record_query not in connection.execute_wrappers:
+        # Outermost: a connection opened inside an execute_wrapper() block
+        # must leave that block's wrapper last, where the block pops it from
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def current_view_name() -> str:
+    request = _request.get()
+    match = getattr(request, 'resolver_match', None)
+    return (match.view_name if match else None) or NO_VIEW
+
+
+def set_request(request):
+    return _request.set(request)
+
+
+def reset_request(token):
+    _request.reset(token)
@@ -0,0 +1,117 @@
+import functools
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .middleware import AsyncCapableMiddleware
+
+PIN_COOKIE = 'db_primary_pin'
+
+# Replica alias that reads of the current request may use; None means primary
+_read_alias: ContextVar[Optional[str]] = ContextVar('vacations_read_alias', default=None)
+
+
+class ReplicaRouter:
+    """
+    Database router that sends reads to a replica inside ``read_from_replica``.
+
+    Reads anywhere else, and every write, go to the primary (``default``).
+    Writes name the primary explicitly, so an object loaded from a replica
+    is still saved to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication
+        return db not in settings.DATABASE_REPLICAS
+
+
+def is_pinned_to_primary(request) -> bool:
+    return PIN_COOKIE in request.COOKIES
+
+
+def replica_for(request) -> Optional[str]:
+    """
+    Pick a replica alias for the request's reads, or None to use the primary.
+    """
+    if not settings.DATABASE_REPLICAS or request.method not in ('GET', 'HEAD') or is_pinned_to_primary(request):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+@contextmanager
+def read_from_replica(request):
+    """
+    Route reads inside the block to a replica unless the request must see the primary.
+
+    Args:
+        request: HTTP request being served
+    """
+    token = _read_alias.set(replica_for(request))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replica(view_func):
+    """
+    View decorator that serves the view's reads from a replica.
+
+    Apply it inside ``login_required`` so the session user is still loaded
+    from the primary.
+    """
+    if iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            with read_from_replica(request):
+                return await view_func(request, *args, **kwargs)
+    else:
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with read_from_replica(request):
+                return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryPinMiddleware(AsyncCapableMiddleware):
+    """
+    Keep a client's reads on the primary for a while after it writes.
+
+    Any successful unsafe request (a like toggle, a vacation edit, a login)
+    sets a short-lived cookie, so the client's next page shows its own change
+    instead of a replica that may lag behind.
+    """
+
+    def handle(self, request):
+        return self.pin(request, self.get_response(request))
+
+    async def ahandle(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
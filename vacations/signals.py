@@ -0,0 +1,133 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from .cards import bump_likes_version, invalidate_card, invalidate_cards
+from .images import release_image
+from .instrumentation import install_query_timer
+from .metrics import LIKE_TOGGLES
+from .querystats import install_query_recorder
+
+# Sent by Like.objects.toggle with user_id, vacation_id, liked and like_count.
+# The toggle bypasses model save/delete, so this is the hook for like changes.
+like_toggled = Signal()
+
+connection_created.connect(install_query_recorder, dispatch_uid='vacations.querystats')
+connection_created.connect(install_query_timer, dispatch_uid='vacations.instrumentation')
+
+
+@receiver(pre_save, sender='vacations.Vacation')
+def remember_card_version(sender, instance, **kwargs):
+    # updated_at is only refreshed after pre_save, so this is the version being replaced
+    instance._previous_card_version = None if instance._state.adding else instance.updated_at
+
+
+@receiver(post_save, sender='vacations.Vacation')
+@receiver(post_delete, sender='vacations.Vacation')
+def invalidate_vacation_card(sender, instance, using, signal, **kwargs):
+    """
+    Drop the replaced version's card fragments once a vacation edit or delete is committed.
+
+    The new version has keys of its own, so this only frees the old entries.
+    """
+    vacation_id = instance.pk
+    if signal is post_save:
+        updated_at = getattr(instance, '_previous_card_version', None)
+    else:
+        updated_at = instance.updated_at
+    if updated_at is not None:
+        transaction.on_commit(lambda: invalidate_card(vacation_id, updated_at), using=using)
+
+
+@receiver(post_save, sender='vacations.Country')
+def invalidate_country_cards(sender, instance, created, using, **kwargs):
+    """
+    Refresh the country's vacations, whose cards show the country name, after a rename.
+
+    Their updated_at is bumped in the same transaction, which moves them to
+    new card keys and changes the list's conditional GET validators. The
+    replaced cards are dropped once it commits.
+    """
+    if created:
+        return
+    from .models import Vacation
+
+    vacations = Vacation.objects.using(using).filter(country_id=instance.pk)
+    versions = list(vacations.values_list('pk', 'updated_at'))
+    if not versions:
+        return
+    vacations.update(updated_at=timezone.now())
+    transaction.on_commit(lambda: invalidate_cards(versions), using=using)
+
+
+@receiver(like_toggled)
+@receiver(post_delete, sender='vacations.Vacation')
+def bump_likes_version_on_change(sender, using=None, **kwargs):
+    """
+    Record that like counts changed, for validators built on the like version.
+    
+    Deleting a vacation also deletes its likes, and it is the one listing
+    change that leaves MAX(updated_at) untouched.
+    """
+    transaction.on_commit(bump_likes_version, using=using)
+
+
+@receiver(pre_delete, sender='vacations.User')
+def uncount_deleted_user_likes(sender, instance, using, **kwargs):
+    """
+    Take a deleted user's likes off the vacations' like counts.
+
+    The user's Like rows go with the cascade, which sends no Like signals,
+    so the counters are decremented here, inside the delete's transaction.
+    """
+    from .models import Vacation
+
+    liked = instance.likes.using(using).values('vacation_id').annotate(removed=Count('pk')).order_by()
+    for row in liked:
+        Vacation.objects.using(using).filter(pk=row['vacation_id']).update(
+            like_count=F('like_count') - row['removed']
+        )
+    if liked:
+        transaction.on_commit(bump_likes_version, using=using)
+
+
+@receiver(post_delete, sender='vacations.Vacation')
+def release_vacation_image(sender, instance, using, **kwargs):
+    """
+    Garbage-collect the deleted vacation's image if no other vacation uses it.
+    """
+    image_file = instance.image_file
+    transaction.on_commit(lambda: release_image(image_file), using=using)
+
+
+@receiver(post_save, sender='vacations.Role')
+@receiver(post_delete, sender='vacations.Role')
+def clear_role_cache(sender, using=None, **kwargs):
+    """
+    Drop this process's cached roles, and every user snapshot, when a role changes.
+    """
+    # Imported here because user_snapshots imports the models, which import this module
+    from .user_snapshots import bump_snapshot_generation
+
+    sender.objects.clear_cache()
+    transaction.on_commit(bump_snapshot_generation, using=using)
+
+
+@receiver(post_save, sender='vacations.User')
+@receiver(post_delete, sender='vacations.User')
+def invalidate_user_snapshot_on_change(sender, instance, using, **kwargs):
+    """
+    Drop a user's cached snapshot once a change to the user is committed.
+    """
+    from .user_snapshots import invalidate_user_snapshot
+
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user_snapshot(user_id), using=using)
+
+
+@receiver(like_toggled)
+def count_like_toggle(sender, liked, **kwargs):
+    LIKE_TOGGLES.labels('like' if liked else 'unlike').inc()
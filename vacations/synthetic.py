@@ -0,0 +1,145 @@
+import csv
+import io
+import itertools
+import random
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from django.db import connection
+
+FIRST_NAMES = ['Noa', 'David', 'Maya', 'Daniel', 'Yael', 'Ariel', 'Tamar', 'Omer', 'Lior', 'Shira',
+               'Emma', 'Liam', 'Olivia', 'Lucas', 'Sofia', 'Mateo', 'Mia', 'Hugo', 'Lea', 'Leon']
+LAST_NAMES = ['Cohen', 'Levi', 'Mizrahi', 'Peretz', 'Biton', 'Garcia', 'Rossi', 'Martin', 'Muller',
+              'Tanaka', 'Silva', 'Smith', 'Brown', 'Lopez', 'Dubois', 'Schmidt', 'Sato', 'Costa']
+DESCRIPTIONS = [
+    'City break with guided walking tours, local food markets and a day trip to the coast.',
+    'Relaxed beach holiday with an all-inclusive resort, snorkelling and sunset cruises.',
+    'Culture-packed tour of museums, historic quarters and the best restaurants in town.',
+    'Mountain escape with hiking trails, a cosy lodge and breathtaking views every morning.',
+    'Family-friendly package with theme parks, boat rides and plenty of free time.',
+]
+SEEDED_IMAGES = ['telaviv', 'madrid', 'rome', 'paris', 'berlin', 'tokyo', 'rio', 'buenosaires',
+                 'nyc', 'sydney', 'medellin', 'losangeles']
+
+
+def zipf_like_counts(vacation_count: int, like_count: int, user_count: int, exponent: float) -> List[int]:
+    """
+    Split a like budget over vacations by popularity rank, Zipf style.
+
+    The vacation at rank ``r`` (1-based) gets a share proportional to
+    ``1 / r ** exponent``, capped at one like per user.
+
+    Returns:
+        List[int]: Like count for each rank, most popular first
+    """
+    weights = [1 / rank ** exponent for rank in range(1, vacation_count + 1)]
+    total = sum(weights)
+    return [min(user_count, round(like_count * weight / total)) for weight in weights]
+
+
+def generate_users(rng: random.Random, count: int, email_prefix: str, password_hash: str,
+                   role_id: int, now: datetime) -> Iterator[tuple]:
+    """
+    Yield user rows in USER_FIELDS order. Every user shares one password hash.
+    """
+    for index in range(count):
+        yield (
+            f'{email_prefix}{index}@example.com',
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+            password_hash,
+            role_id,
+            True,
+            False,
+            False,
+            now,
+        )
+
+
+USER_FIELDS = ['email', 'first_name', 'last_name', 'password', 'role_id',
+               'is_active', 'is_staff', 'is_superuser', 'date_joined']
+
+
+def generate_vacations(rng: random.Random, like_counts: Sequence[int], country_ids: Sequence[int],
+                       today: date, now: datetime) -> Iterator[tuple]:
+    """
+    Yield vacation rows in VACATION_FIELDS order, one per entry of ``like_counts``.
+    """
+    for likes in like_counts:
+        # After the seeded vacations (up to 175 days out), which populate_db
+        # looks up by country and start date
+        start_date = today + timedelta(days=rng.randint(200, 930))
+        yield (
+            rng.choice(country_ids),
+            rng.choice(DESCRIPTIONS),
+            start_date,
+            start_date + timedelta(days=rng.randint(3, 21)),
+            rng.randint(300, 9999),
+            f'images/vacation_images/{rng.choice(SEEDED_IMAGES)}.jpg',
+            likes,
+            now,
+        )
+
+
+VACATION_FIELDS = ['country_id', 'description', 'start_date', 'end_date', 'price',
+                   'image_file', 'like_count', 'updated_at']
+
+
+def generate_likes(rng: random.Random, vacation_ids: Sequence[int], like_counts: Sequence[int],
+                   user_ids: Sequence[int], now: datetime) -> Iterator[tuple]:
+    """
+    Yield like rows in LIKE_FIELDS order: ``like_counts[i]`` distinct users for ``vacation_ids[i]``.
+    """
+    for vacation_id, likes in zip(vacation_ids, like_counts):
+        for user_id in rng.sample(user_ids, likes):
+            yield user_id, vacation_id, now
+
+
+LIKE_FIELDS = ['user_id', 'vacation_id', 'updated_at']
+
+
+def insert_rows(model, fields: List[str], rows: Iterable[tuple], batch_size: int, use_copy: bool) -> int:
+    """
+    Insert rows in batches with COPY (PostgreSQL) or bulk_create.
+
+    Args:
+        model: Model class to insert into
+        fields: Column attnames, in the order of each row tuple
+        rows: Row tuples, consumed lazily
+        batch_size: Rows per COPY or bulk_create call
+        use_copy: Use COPY FROM STDIN (PostgreSQL only)
+
+    Returns:
+        int: Number of rows inserted
+    """
+    inserted = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return inserted
+        if use_copy:
+            copy_rows(model._meta.db_table, fields, batch)
+        else:
+            model.objects.bulk_create(
+                [model(**dict(zip(fields, row))) for row in batch],
+                batch_size=batch_size,
+            )
+        inserted += len(batch)
+
+
+def copy_rows(table: str, fields: List[str], rows: List[Tuple]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    columns = ', '.join(connection.ops.quote_name(field) for field in fields)
+    sql = f'COPY {connection.ops.quote_name(table)} ({columns}) FROM STDIN WITH (FORMAT csv)'
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            # psycopg2
+            raw_cursor.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
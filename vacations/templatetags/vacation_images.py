@@ -0,0 +1,48 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from ..images import available_variants
+
+register = template.Library()
+
+# Cards are a third of the row from the md breakpoint up, full width below it
+DEFAULT_SIZES = '(min-width: 768px) 33vw, 100vw'
+
+
+@register.simple_tag
+def vacation_picture(vacation, css_class='', style='', sizes=DEFAULT_SIZES):
+    """
+    Render a responsive ``<picture>`` for a vacation's image.
+    
+    WebP variants are offered first with JPEG variants as the fallback
+    ``srcset``, so browsers download the smallest file that fills the slot.
+    Images without variants fall back to the original upload.
+    
+    Usage::
+    
+        {% load vacation_images %}
+        {% vacation_picture vacation css_class="card-img-top" style="height: 200px;" %}
+    """
+    image_file = vacation.image_file
+    variants = available_variants(image_file)
+    
+    def srcset(mime_type):
+        return ', '.join(f'{url} {width}w' for width, url in variants.get(mime_type, []))
+    
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime_type, srcset(mime_type), sizes) for mime_type in variants if mime_type != 'image/jpeg'),
+    )
+    jpeg_srcset = srcset('image/jpeg')
+    img_srcset = format_html(' srcset="{}" sizes="{}"', jpeg_srcset, sizes) if jpeg_srcset else ''
+    
+    return format_html(
+        '<picture>{}<img src="{}"{} class="{}" alt="{}" style="{}" loading="lazy" decoding="async"></picture>',
+        sources,
+        default_storage.url(image_file),
+        img_srcset,
+        css_class,
+        vacation.country.country_name,
+        style,
+    )
@@ -1,9 +1,55 @@
-from django.test import TestCase, Client
+import asyncio
+import copy
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import AsyncClient, TestCase, TransactionTestCase, Client, RequestFactory, override_settings, skipUnlessDBFeature
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache, caches
+from django.core.exceptions import BadRequest
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.template import Context as TemplateContext, Template
 from datetime import date, timedelta
+from io import BytesIO, StringIO
+from PIL import Image
+from prometheus_client import REGISTRY, CollectorRegistry
+from prometheus_client.multiprocess import MultiProcessCollector
+from . import log_handlers, synthetic
+from .benchmarking import benchmark_endpoint, compare_results, percentile
+from .cards import attach_card_html, card_cache_key, get_likes_version
+from .hashing import BoundedHashingExecutor, HashingBusy, get_executor
+from .instrumentation import record_request
+from .log_handlers import JSONFormatter, QueuedRotatingFileHandler
+from .querystats import OVERFLOW_FINGERPRINT, QueryStats, fingerprint, query_stats
+from .profiling import StackSampler, hot_functions, issue_profile_token, read_collapsed, write_collapsed
+from .images import (
+    content_addressed_name, generate_variants, is_content_addressed, lock_image, release_image, variant_name, wait_for_variants,
+)
+from .backends import EmailBackend
+from .middleware import AsyncCapableMiddleware, RequestTimingMiddleware
 from .models import Role, Country, Vacation, Like
+from .pagination import KeysetPage, decode_cursor, encode_cursor, keyset_queryset
+from .routers import PIN_COOKIE, ReplicaRouter, read_from_replica
+from .throttling import TokenBucket
 
 User = get_user_model()
 
@@ -54,11 +100,15 @@ class ModelTestCase(TestCase):
     def test_like_functionality(self):
         # User likes vacation
         like = Like.objects.create(user=self.regular_user, vacation=self.vacation)
+        Vacation.objects.recount_likes()
+        self.vacation.refresh_from_db()
         self.assertEqual(self.vacation.like_count, 1)
         self.assertTrue(self.vacation.is_liked_by_user(self.regular_user))
         
         # User unlikes vacation
         like.delete()
+        Vacation.objects.recount_likes()
+        self.vacation.refresh_from_db()
         self.assertEqual(self.vacation.like_count, 0)
         self.assertFalse(self.vacation.is_liked_by_user(self.regular_user))
 
@@ -155,6 +205,16 @@ class ViewTestCase(TestCase):
         
         # Verify like exists
         self.assertTrue(Like.objects.filter(user=self.regular_user, vacation=vacation).exists())
+        self.assertEqual(response.json()['like_count'], 1)
+        vacation.refresh_from_db()
+        self.assertEqual(vacation.like_count, 1)
+        
+        # Unlike vacation
+        response = self.client.post(reverse('toggle_like', args=[vacation.id]))
+        self.assertFalse(response.json()['liked'])
+        self.assertEqual(response.json()['like_count'], 0)
+        vacation.refresh_from_db()
+        self.assertEqual(vacation.like_count, 0)
 
 
 class FormTestCase(TestCase):
@@ -225,3 +285,2195 @@ class FormTestCase(TestCase):
         }
         form = VacationForm(data=form_data)
         self.assertFalse(form.is_valid())
+
+
+@override_settings(VACATION_PAGE_SIZE=50)
+class VacationListQueryTestCase(TestCase):
+    """
+    Guards the vacation list against per-card N+1 queries.
+    """
+    # session, user with role, ETag validator and the annotated vacation query
+    LIST_QUERY_BUDGET = 4
+    
+    def setUp(self):
+        self.client = Client()
+        
+        self.user_role = Role.objects.create(role_name='user')
+        self.admin_role = Role.objects.create(role_name='admin')
+        
+        self.regular_user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='User',
+            last_name='Test',
+            role=self.user_role
+        )
+        self.other_user = User.objects.create_user(
+            email='other@test.com',
+            password='testpass123',
+            first_name='Other',
+            last_name='Test',
+            role=self.user_role
+        )
+        User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='Test',
+            role=self.admin_role
+        )
+        
+        self.countries = [
+            Country.objects.create(country_name=f'Country {i}') for i in range(3)
+        ]
+    
+    def create_vacations(self, count):
+        vacations = []
+        for i in range(count):
+            vacations.append(Vacation.objects.create(
+                country=self.countries[i % len(self.countries)],
+                description=f'Vacation {i}',
+                start_date=date.today() + timedelta(days=30 + i),
+                end_date=date.today() + timedelta(days=40 + i),
+                price=1000.00,
+                image_file='test.jpg'
+            ))
+        return vacations
+    
+    def test_query_count_is_constant(self):
+        self.client.login(email='user@test.com', password='testpass123')
+        
+        self.create_vacations(3)
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET):
+            self.client.get(reverse('vacation_list'))
+        
+        self.create_vacations(30)
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET):
+            response = self.client.get(reverse('vacation_list'))
+        self.assertEqual(len(response.context['vacations']), 33)
+    
+    def test_admin_query_count_is_constant(self):
+        self.client.login(email='admin@test.com', password='testpass123')
+        
+        self.create_vacations(30)
+        with self.assertNumQueries(self.LIST_QUERY_BUDGET):
+            self.client.get(reverse('vacation_list'))
+    
+    def test_like_info_annotations(self):
+        liked, popular, plain = self.create_vacations(3)
+        Like.objects.create(user=self.regular_user, vacation=liked)
+        Like.objects.create(user=self.other_user, vacation=popular)
+        Like.objects.create(user=self.regular_user, vacation=popular)
+        Like.objects.create(user=self.other_user, vacation=plain)
+        Vacation.objects.recount_likes()
+        
+        self.client.login(email='user@test.com', password='testpass123')
+        response = self.client.get(reverse('vacation_list'))
+        
+        annotated = {v.id: v for v in response.context['vacations']}
+        self.assertEqual(annotated[liked.id].like_count, 1)
+        self.assertEqual(annotated[popular.id].like_count, 2)
+        self.assertEqual(annotated[plain.id].like_count, 1)
+        self.assertTrue(annotated[liked.id].user_liked)
+        self.assertTrue(annotated[popular.id].user_liked)
+        self.assertFalse(annotated[plain.id].user_liked)
+
+
+class LikeCountTestCase(TestCase):
+    """
+    Tests for the denormalized Vacation.like_count column.
+    """
+    
+    def setUp(self):
+        self.user_role = Role.objects.create(role_name='user')
+        self.country = Country.objects.create(country_name='Test Country')
+        self.users = [
+            User.objects.create_user(
+                email=f'user{i}@test.com',
+                password='testpass123',
+                first_name='User',
+                last_name=str(i),
+                role=self.user_role
+            )
+            for i in range(3)
+        ]
+        self.vacation = Vacation.objects.create(
+            country=self.country,
+            description='Test vacation',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=40),
+            price=1000.00,
+            image_file='test.jpg'
+        )
+    
+    def test_recount_repairs_drift(self):
+        for user in self.users:
+            Like.objects.create(user=user, vacation=self.vacation)
+        
+        self.assertEqual(Vacation.objects.recount_likes(dry_run=True), 1)
+        self.assertEqual(Vacation.objects.recount_likes(), 1)
+        self.vacation.refresh_from_db()
+        self.assertEqual(self.vacation.like_count, 3)
+        
+        # Nothing left to repair
+        self.assertEqual(Vacation.objects.recount_likes(), 0)
+    
+    def test_recount_likes_command(self):
+        Like.objects.create(user=self.users[0], vacation=self.vacation)
+        Vacation.objects.filter(pk=self.vacation.pk).update(like_count=7)
+        
+        out = StringIO()
+        call_command('recount_likes', '--dry-run', stdout=out)
+        self.assertIn('1 vacation(s)', out.getvalue())
+        self.vacation.refresh_from_db()
+        self.assertEqual(self.vacation.like_count, 7)
+        
+        call_command('recount_likes', stdout=StringIO())
+        self.vacation.refresh_from_db()
+        self.assertEqual(self.vacation.like_count, 1)
+    
+    def test_save_does_not_overwrite_like_count(self):
+        stale = Vacation.objects.get(pk=self.vacation.pk)
+        Vacation.objects.filter(pk=self.vacation.pk).update(like_count=5)
+        
+        stale.description = 'Edited description'
+        stale.save()
+        
+        self.vacation.refresh_from_db()
+        self.assertEqual(self.vacation.description, 'Edited description')
+        self.assertEqual(self.vacation.like_count, 5)
+
+    def test_deleting_user_uncounts_their_likes(self):
+        for user in self.users[:2]:
+            Like.objects.toggle(user, self.vacation.pk)
+        version = get_likes_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.users[0].delete()
+
+        self.vacation.refresh_from_db()
+        self.assertEqual(self.vacation.like_count, 1)
+        self.assertEqual(Like.objects.filter(vacation=self.vacation).count(), 1)
+        self.assertNotEqual(get_likes_version(), version)
+
+        # Users removed by a role cascade are uncounted too
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_role.delete()
+
+        self.vacation.refresh_from_db()
+        self.assertEqual(self.vacation.like_count, 0)
+
+
+class LikeToggleTestCase(TestCase):
+    """
+    Tests for Like.objects.toggle and the like toggle endpoint.
+    """
+    
+    def setUp(self):
+        self.client = Client()
+        self.user_role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='User',
+            last_name='Test',
+            role=self.user_role
+        )
+        self.country = Country.objects.create(country_name='Test Country')
+        self.vacation = Vacation.objects.create(
+            country=self.country,
+            description='Test vacation',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=40),
+            price=1000.00,
+            image_file='test.jpg'
+        )
+    
+    def test_toggle_like_and_unlike(self):
+        self.assertEqual(Like.objects.toggle(self.user, self.vacation.id), (True, 1))
+        self.assertTrue(Like.objects.filter(user=self.user, vacation=self.vacation).exists())
+        
+        self.assertEqual(Like.objects.toggle(self.user, self.vacation.id), (False, 0))
+        self.assertFalse(Like.objects.filter(user=self.user, vacation=self.vacation).exists())
+    
+    def test_toggle_missing_vacation(self):
+        self.assertIsNone(Like.objects.toggle(self.user, self.vacation.id + 1000))
+        self.assertFalse(Like.objects.exists())
+        
+        self.client.login(email='user@test.com', password='testpass123')
+        response = self.client.post(reverse('toggle_like', args=[self.vacation.id + 1000]))
+        self.assertEqual(response.status_code, 404)
+    
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'single-statement toggle is PostgreSQL only')
+    def test_toggle_is_one_round_trip(self):
+        with self.assertNumQueries(1):
+            Like.objects.toggle(self.user, self.vacation.id)
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class LikeToggleConcurrencyTestCase(TransactionTestCase):
+    """
+    Hammers a single vacation with concurrent toggles from many threads.
+    """
+    THREADS = 8
+    TOGGLES_PER_THREAD = 15
+    
+    def setUp(self):
+        user_role = Role.objects.create(role_name='user')
+        country = Country.objects.create(country_name='Test Country')
+        self.vacation = Vacation.objects.create(
+            country=country,
+            description='Test vacation',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=40),
+            price=1000.00,
+            image_file='test.jpg'
+        )
+        # Half the threads share one user so they race on the same like row
+        shared = User.objects.create_user(
+            email='shared@test.com', password='testpass123',
+            first_name='Shared', last_name='User', role=user_role
+        )
+        self.users = [
+            shared if i % 2 else User.objects.create_user(
+                email=f'user{i}@test.com', password='testpass123',
+                first_name='User', last_name=str(i), role=user_role
+            )
+            for i in range(self.THREADS)
+        ]
+    
+    def test_concurrent_toggles_keep_count_consistent(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        
+        def hammer(user):
+            try:
+                barrier.wait()
+                for _ in range(self.TOGGLES_PER_THREAD):
+                    self.assertIsNotNone(Like.objects.toggle(user, self.vacation.id))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=hammer, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.vacation.refresh_from_db()
+        self.assertEqual(self.vacation.like_count, Like.objects.filter(vacation=self.vacation).count())
+        self.assertEqual(Vacation.objects.recount_likes(dry_run=True), 0)
+
+
+@override_settings(VACATION_PAGE_SIZE=5)
+class VacationPaginationTestCase(TestCase):
+    """
+    Tests for keyset pagination of the vacation list and JSON feed.
+    """
+    
+    def setUp(self):
+        self.client = Client()
+        user_role = Role.objects.create(role_name='user')
+        User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='User',
+            last_name='Test',
+            role=user_role
+        )
+        country = Country.objects.create(country_name='Test Country')
+        
+        # Several vacations share a start date so the id tie-breaker matters
+        self.vacations = [
+            Vacation.objects.create(
+                country=country,
+                description=f'Vacation {i}',
+                start_date=date.today() + timedelta(days=30 + i // 3),
+                end_date=date.today() + timedelta(days=40 + i // 3),
+                price=1000.00,
+                image_file='test.jpg'
+            )
+            for i in range(12)
+        ]
+        self.expected_ids = [
+            v.id for v in sorted(self.vacations, key=lambda v: (v.start_date, v.id))
+        ]
+        self.client.login(email='user@test.com', password='testpass123')
+    
+    def test_cursor_roundtrip(self):
+        cursor = encode_cursor(date(2030, 1, 2), 42)
+        self.assertEqual(decode_cursor(cursor), (date(2030, 1, 2), 42))
+    
+    def test_cursor_with_out_of_range_id_is_rejected(self):
+        for pk in (0, -1, 2 ** 63):
+            with self.subTest(pk=pk), self.assertRaisesMessage(BadRequest, 'Invalid page cursor'):
+                decode_cursor(encode_cursor(date(2030, 1, 2), pk))
+        
+        response = self.client.get(reverse('vacation_feed'), {'after': encode_cursor(date(2030, 1, 2), 2 ** 63)})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_feed_walks_every_vacation_once(self):
+        seen = []
+        url = reverse('vacation_feed')
+        params = {}
+        while True:
+            data = self.client.get(url, params).json()
+            self.assertLessEqual(len(data['vacations']), 5)
+            seen.extend(v['id'] for v in data['vacations'])
+            if not data['next_cursor']:
+                break
+            params = {'after': data['next_cursor']}
+        
+        self.assertEqual(seen, self.expected_ids)
+    
+    def test_list_pages_with_partial_responses(self):
+        response = self.client.get(reverse('vacation_list'))
+        self.assertEqual([v.id for v in response.context['vacations']], self.expected_ids[:5])
+        self.assertContains(response, 'vacation-scroll-sentinel')
+        
+        response = self.client.get(reverse('vacation_list'), {
+            'after': response.context['next_cursor'],
+            'partial': '1',
+        })
+        self.assertEqual([v.id for v in response.context['vacations']], self.expected_ids[5:10])
+        self.assertNotContains(response, '<html')
+        self.assertIn('X-Next-Cursor', response)
+        
+        response = self.client.get(reverse('vacation_list'), {
+            'after': response['X-Next-Cursor'],
+            'partial': '1',
+        })
+        self.assertEqual([v.id for v in response.context['vacations']], self.expected_ids[10:])
+        self.assertNotIn('X-Next-Cursor', response)
+    
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('vacation_feed'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'card-tests'},
+})
+class CardCacheTestCase(TestCase):
+    """
+    Tests for cached vacation card fragments and their invalidation.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user_role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='User',
+            last_name='Test',
+            role=self.user_role
+        )
+        self.country = Country.objects.create(country_name='Test Country')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vacation = Vacation.objects.create(
+                country=self.country,
+                description='Original description',
+                start_date=date.today() + timedelta(days=30),
+                end_date=date.today() + timedelta(days=40),
+                price=1000.00,
+                image_file='test.jpg'
+            )
+        self.client.login(email='user@test.com', password='testpass123')
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def test_card_is_served_from_cache(self):
+        self.client.get(reverse('vacation_list'))
+        self.assertIsNotNone(cache.get(card_cache_key(self.vacation.pk, self.vacation.updated_at, 'user')))
+        
+        # A write that bypasses Vacation.save (and updated_at) is not seen
+        Vacation.objects.filter(pk=self.vacation.pk).update(description='Sneaky edit')
+        response = self.client.get(reverse('vacation_list'))
+        self.assertContains(response, 'Original description')
+    
+    def test_save_invalidates_card(self):
+        self.client.get(reverse('vacation_list'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vacation.description = 'Edited description'
+            self.vacation.save()
+        
+        response = self.client.get(reverse('vacation_list'))
+        self.assertContains(response, 'Edited description')
+        self.assertNotContains(response, 'Original description')
+    
+    def test_late_render_of_an_old_row_is_never_served(self):
+        old_row = Vacation.objects.select_related('country').get(pk=self.vacation.pk)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vacation.description = 'Edited description'
+            self.vacation.save()
+        # A render that read the row before the edit stores its card after the invalidation
+        attach_card_html([old_row], is_admin=False)
+        
+        self.assertIsNotNone(cache.get(card_cache_key(old_row.pk, old_row.updated_at, 'user')))
+        response = self.client.get(reverse('vacation_list'))
+        self.assertContains(response, 'Edited description')
+        self.assertNotContains(response, 'Original description')
+    
+    def test_delete_invalidates_card(self):
+        admin_role = Role.objects.create(role_name='admin')
+        User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='Test',
+            role=admin_role
+        )
+        self.client.login(email='admin@test.com', password='testpass123')
+        self.client.get(reverse('vacation_list'))
+        self.assertIsNotNone(cache.get(card_cache_key(self.vacation.pk, self.vacation.updated_at, 'admin')))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_vacation', args=[self.vacation.pk]))
+        
+        self.assertIsNone(cache.get(card_cache_key(self.vacation.pk, self.vacation.updated_at, 'admin')))
+    
+    def test_like_state_is_layered_per_user(self):
+        self.client.get(reverse('vacation_list'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('toggle_like', args=[self.vacation.pk]))
+        self.assertTrue(response.json()['liked'])
+        
+        response = self.client.get(reverse('vacation_list'))
+        self.assertContains(response, 'data-liked="true"')
+        self.assertContains(response, '<span class="like-count">1</span>', html=True)
+    
+    def test_country_rename_invalidates_card(self):
+        self.client.get(reverse('vacation_list'))
+        updated_at = Vacation.objects.get(pk=self.vacation.pk).updated_at
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.country.country_name = 'Renamed Country'
+            self.country.save()
+        
+        self.assertIsNone(cache.get(card_cache_key(self.vacation.pk, updated_at, 'user')))
+        # The list validators see the change too
+        self.assertGreater(Vacation.objects.get(pk=self.vacation.pk).updated_at, updated_at)
+        response = self.client.get(reverse('vacation_list'))
+        self.assertContains(response, 'Renamed Country')
+    
+    def test_like_toggle_bumps_likes_version(self):
+        version = get_likes_version()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('toggle_like', args=[self.vacation.pk]))
+        
+        self.assertNotEqual(get_likes_version(), version)
+
+
+class FileBasedCardCacheTestCase(CardCacheTestCase):
+    """
+    Runs the card cache tests against Django's file-based cache backend.
+    """
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # A directory of its own, so concurrent test runs never share cache files
+        cache_dir = tempfile.mkdtemp(prefix='vacation-card-cache-')
+        cls.addClassCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        # Entered after the parent's LocMemCache override so it takes precedence
+        cls.enterClassContext(override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': cache_dir,
+            },
+        }))
+    
+    def test_uses_file_based_backend(self):
+        self.assertIsInstance(caches['default'], FileBasedCache)
+
+
+class ConditionalListTestCase(TestCase):
+    """
+    Tests for ETag / Last-Modified handling on the vacation list and feed.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user_role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='User',
+            last_name='Test',
+            role=self.user_role
+        )
+        User.objects.create_user(
+            email='other@test.com',
+            password='testpass123',
+            first_name='Other',
+            last_name='Test',
+            role=self.user_role
+        )
+        self.country = Country.objects.create(country_name='Test Country')
+        self.vacation = Vacation.objects.create(
+            country=self.country,
+            description='Test vacation',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=40),
+            price=1000.00,
+            image_file='test.jpg'
+        )
+        self.client.login(email='user@test.com', password='testpass123')
+    
+    def test_matching_etag_returns_304_without_listing_query(self):
+        # The first page view issues the CSRF cookie, which is part of the tag
+        self.client.get(reverse('vacation_list'))
+        
+        for name in ('vacation_list', 'vacation_feed'):
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+            
+            # session, user and the validator aggregate only
+            with self.assertNumQueries(3):
+                response = self.client.get(reverse(name), HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b'')
+    
+    def test_like_toggle_changes_etag(self):
+        etag = self.client.get(reverse('vacation_feed'))['ETag']
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('toggle_like', args=[self.vacation.pk]))
+        
+        response = self.client.get(reverse('vacation_feed'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['vacations'][0]['liked'])
+    
+    def test_vacation_edit_changes_etag(self):
+        etag = self.client.get(reverse('vacation_feed'))['ETag']
+        
+        self.vacation.description = 'Edited description'
+        self.vacation.save()
+        
+        response = self.client.get(reverse('vacation_feed'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_vacation_delete_changes_etag(self):
+        Vacation.objects.create(
+            country=self.country,
+            description='Second vacation',
+            start_date=date.today() + timedelta(days=50),
+            end_date=date.today() + timedelta(days=60),
+            price=1000.00,
+            image_file='test.jpg'
+        )
+        etag = self.client.get(reverse('vacation_feed'))['ETag']
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vacation.delete()
+        
+        response = self.client.get(reverse('vacation_feed'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_etag_is_per_user(self):
+        etag = self.client.get(reverse('vacation_feed'))['ETag']
+        
+        other = Client()
+        other.login(email='other@test.com', password='testpass123')
+        response = other.get(reverse('vacation_feed'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+def make_image_bytes(width, height, image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), color=(200, 80, 40)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class ImageVariantTestCase(TestCase):
+    """
+    Tests for resized image variants and the responsive picture tag.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, VACATION_IMAGE_WIDTHS=[320, 640, 960]))
+        # Finish background variant jobs while this test's MEDIA_ROOT is still in effect
+        self.addCleanup(wait_for_variants)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        
+        self.country = Country.objects.create(country_name='Test Country')
+        admin_role = Role.objects.create(role_name='admin')
+        User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='Test',
+            role=admin_role
+        )
+    
+    def store_image(self, name, width, height):
+        return default_storage.save(name, ContentFile(make_image_bytes(width, height)))
+    
+    def test_generate_variants_skips_upscaling(self):
+        path = self.store_image('images/vacation_images/wide.jpg', 800, 400)
+        
+        written = generate_variants(path)
+        
+        self.assertEqual(sorted(written), sorted([
+            'images/vacation_images/variants/wide-320w.webp',
+            'images/vacation_images/variants/wide-320w.jpg',
+            'images/vacation_images/variants/wide-640w.webp',
+            'images/vacation_images/variants/wide-640w.jpg',
+        ]))
+        with default_storage.open('images/vacation_images/variants/wide-320w.webp') as variant:
+            image = Image.open(variant)
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (320, 160))
+        
+        # Existing variants are left alone unless forced
+        self.assertEqual(generate_variants(path), [])
+        self.assertEqual(len(generate_variants(path, force=True)), 4)
+    
+    def test_large_and_rotated_jpegs_keep_their_proportions(self):
+        # Drafted at a quarter of the size, which still leaves twice 320px
+        path = self.store_image('images/vacation_images/huge.jpg', 4000, 2000)
+        # Stored landscape, displayed portrait (EXIF orientation 6)
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        Image.new('RGB', (800, 400), color=(200, 80, 40)).save(buffer, 'JPEG', exif=exif)
+        rotated = default_storage.save('images/vacation_images/rotated.jpg', ContentFile(buffer.getvalue()))
+        
+        with override_settings(VACATION_IMAGE_WIDTHS=[320]):
+            generate_variants(path)
+            generate_variants(rotated)
+        
+        with default_storage.open(variant_name(path, 320, 'jpg')) as variant:
+            self.assertEqual(Image.open(variant).size, (320, 160))
+        with default_storage.open(variant_name(rotated, 320, 'jpg')) as variant:
+            self.assertEqual(Image.open(variant).size, (320, 640))
+    
+    def test_unreadable_image_is_skipped(self):
+        path = default_storage.save('images/vacation_images/broken.jpg', ContentFile(b'not an image'))
+        self.assertEqual(generate_variants(path), [])
+    
+    def test_picture_tag_renders_srcset(self):
+        path = self.store_image('images/vacation_images/wide.jpg', 800, 400)
+        generate_variants(path)
+        vacation = Vacation(country=self.country, image_file=path)
+        
+        html = Template(
+            '{% load vacation_images %}{% vacation_picture vacation css_class="card-img-top" %}'
+        ).render(TemplateContext({'vacation': vacation}))
+        
+        self.assertIn('<source type="image/webp" srcset="/media/images/vacation_images/variants/wide-320w.webp 320w, '
+                      '/media/images/vacation_images/variants/wide-640w.webp 640w"', html)
+        self.assertIn('srcset="/media/images/vacation_images/variants/wide-320w.jpg 320w, '
+                      '/media/images/vacation_images/variants/wide-640w.jpg 640w"', html)
+        self.assertIn('src="/media/images/vacation_images/wide.jpg"', html)
+        self.assertIn('loading="lazy"', html)
+    
+    def test_picture_tag_without_variants(self):
+        vacation = Vacation(country=self.country, image_file='images/vacation_images/missing.jpg')
+        
+        html = Template(
+            '{% load vacation_images %}{% vacation_picture vacation %}'
+        ).render(TemplateContext({'vacation': vacation}))
+        
+        self.assertNotIn('srcset', html)
+        self.assertIn('src="/media/images/vacation_images/missing.jpg"', html)
+    
+    def test_upload_generates_variants_after_commit(self):
+        client = Client()
+        client.login(email='admin@test.com', password='testpass123')
+        upload = SimpleUploadedFile('beach.jpg', make_image_bytes(1200, 800), content_type='image/jpeg')
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = client.post(reverse('add_vacation'), {
+                'country': self.country.id,
+                'description': 'Beach vacation',
+                'start_date': date.today() + timedelta(days=30),
+                'end_date': date.today() + timedelta(days=40),
+                'price': 1000.00,
+                'image': upload,
+            })
+        
+        self.assertEqual(response.status_code, 302)
+        vacation = Vacation.objects.get(description='Beach vacation')
+        # Nothing is decoded inside the request
+        self.assertFalse(default_storage.exists(variant_name(vacation.image_file, 320, 'webp')))
+        cache.set(card_cache_key(vacation.pk, vacation.updated_at, 'user'), 'card without variants')
+        
+        for callback in callbacks:
+            callback()
+        wait_for_variants()
+        
+        for width in (320, 640, 960):
+            self.assertTrue(default_storage.exists(variant_name(vacation.image_file, width, 'webp')))
+        self.assertIsNone(cache.get(card_cache_key(vacation.pk, vacation.updated_at, 'user')))
+    
+    def test_backfill_command(self):
+        path = self.store_image('images/vacation_images/old.jpg', 1000, 500)
+        Vacation.objects.create(
+            country=self.country,
+            description='Old vacation',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=40),
+            price=1000.00,
+            image_file=path
+        )
+        
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        
+        self.assertIn('Wrote 6 variant(s) for 1 image(s)', out.getvalue())
+        self.assertTrue(default_storage.exists(variant_name(path, 960, 'jpg')))
+
+
+class UploadSizeLimitTestCase(TestCase):
+    """
+    Tests for the streaming upload size cap.
+    """
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        
+        self.country = Country.objects.create(country_name='Test Country')
+        admin_role = Role.objects.create(role_name='admin')
+        User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='Test',
+            role=admin_role
+        )
+        self.client = Client()
+        self.client.login(email='admin@test.com', password='testpass123')
+    
+    def post_vacation(self, image_bytes):
+        return self.client.post(reverse('add_vacation'), {
+            'country': self.country.id,
+            'description': 'Beach vacation',
+            'start_date': date.today() + timedelta(days=30),
+            'end_date': date.today() + timedelta(days=40),
+            'price': 1000.00,
+            'image': SimpleUploadedFile('beach.jpg', image_bytes, content_type='image/jpeg'),
+        })
+    
+    def test_oversized_upload_is_rejected(self):
+        image_bytes = make_image_bytes(400, 300)
+        
+        with override_settings(VACATION_IMAGE_MAX_UPLOAD_SIZE=len(image_bytes) - 1):
+            response = self.post_vacation(image_bytes)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Vacation.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'images')))
+    
+    def test_upload_within_limit_is_stored(self):
+        image_bytes = make_image_bytes(400, 300)
+        
+        with override_settings(VACATION_IMAGE_MAX_UPLOAD_SIZE=len(image_bytes)):
+            response = self.post_vacation(image_bytes)
+        
+        self.assertEqual(response.status_code, 302)
+        vacation = Vacation.objects.get()
+        with default_storage.open(vacation.image_file) as stored:
+            self.assertEqual(stored.read(), image_bytes)
+
+
+class ContentAddressedImageTestCase(TestCase):
+    """
+    Tests for hash-named image storage and garbage collection of unused images.
+    """
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, VACATION_IMAGE_WIDTHS=[320]))
+        # Finish background variant jobs while this test's MEDIA_ROOT is still in effect
+        self.addCleanup(wait_for_variants)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        
+        self.country = Country.objects.create(country_name='Test Country')
+        admin_role = Role.objects.create(role_name='admin')
+        User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='Test',
+            role=admin_role
+        )
+        self.client = Client()
+        self.client.login(email='admin@test.com', password='testpass123')
+        self.image_bytes = make_image_bytes(400, 300)
+    
+    def post_vacation(self, filename, image_bytes):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('add_vacation'), {
+                'country': self.country.id,
+                'description': 'Beach vacation',
+                'start_date': date.today() + timedelta(days=30),
+                'end_date': date.today() + timedelta(days=40),
+                'price': 1000.00,
+                'image': SimpleUploadedFile(filename, image_bytes, content_type='image/jpeg'),
+            })
+        wait_for_variants()
+        return Vacation.objects.latest('id')
+    
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), self.media_root)
+            for root, _, names in os.walk(self.media_root)
+            for name in names
+        )
+    
+    def test_identical_uploads_are_stored_once(self):
+        first = self.post_vacation('beach.jpg', self.image_bytes)
+        second = self.post_vacation('IMG_0001.JPEG', self.image_bytes)
+        
+        self.assertEqual(first.image_file, second.image_file)
+        self.assertTrue(is_content_addressed(first.image_file))
+        self.assertEqual(self.stored_files(), sorted([
+            first.image_file,
+            variant_name(first.image_file, 320, 'webp'),
+            variant_name(first.image_file, 320, 'jpg'),
+        ]))
+    
+    def test_image_is_deleted_with_its_last_vacation(self):
+        first = self.post_vacation('beach.jpg', self.image_bytes)
+        second = self.post_vacation('beach.jpg', self.image_bytes)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_vacation', args=[first.id]))
+        self.assertEqual(len(self.stored_files()), 3)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_vacation', args=[second.id]))
+        self.assertEqual(self.stored_files(), [])
+    
+    def test_replaced_image_is_released(self):
+        vacation = self.post_vacation('beach.jpg', self.image_bytes)
+        old_image = vacation.image_file
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('edit_vacation', args=[vacation.id]), {
+                'country': self.country.id,
+                'description': 'Beach vacation',
+                'start_date': vacation.start_date,
+                'end_date': vacation.end_date,
+                'price': 1000.00,
+                'image': SimpleUploadedFile('new.png', make_image_bytes(500, 300, 'PNG'), content_type='image/png'),
+            })
+        
+        vacation.refresh_from_db()
+        self.assertNotEqual(vacation.image_file, old_image)
+        self.assertTrue(vacation.image_file.endswith('.png'))
+        self.assertFalse(default_storage.exists(old_image))
+        self.assertTrue(default_storage.exists(vacation.image_file))
+    
+    def test_legacy_images_are_never_released(self):
+        default_storage.save('images/vacation_images/default.jpg', ContentFile(self.image_bytes))
+        
+        self.assertFalse(release_image('images/vacation_images/default.jpg'))
+        self.assertTrue(default_storage.exists('images/vacation_images/default.jpg'))
+    
+    def test_content_addressed_name_sanitizes_extension(self):
+        digest = 'ab' * 32
+        self.assertEqual(content_addressed_name(digest, 'x.JPEG'), f'images/vacation_images/ab/{digest}.jpg')
+        self.assertEqual(content_addressed_name(digest, 'x.php;.bad ext'), f'images/vacation_images/ab/{digest}.jpg')
+        self.assertTrue(is_content_addressed(variant_name(f'images/vacation_images/ab/{digest}.jpg', 320, 'webp')))
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ImageReleaseRaceTestCase(TransactionTestCase):
+    """
+    An upload reusing a stored image and the release of that image run concurrently.
+    """
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, VACATION_IMAGE_WIDTHS=[320]))
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.country = Country.objects.create(country_name='Test Country')
+        self.image_file = default_storage.save(content_addressed_name('ab' * 32, 'beach.jpg'), ContentFile(b'jpeg'))
+    
+    def test_release_waits_for_the_upload_to_commit(self):
+        released = []
+        
+        def release():
+            try:
+                released.append(release_image(self.image_file))
+            finally:
+                connection.close()
+        
+        # What save_uploaded_image holds while the upload's vacation is saved
+        with transaction.atomic():
+            lock_image(self.image_file)
+            thread = threading.Thread(target=release)
+            thread.start()
+            thread.join(0.5)
+            self.assertTrue(thread.is_alive())
+            Vacation.objects.create(
+                country=self.country, description='Reuses the image',
+                start_date=date.today() + timedelta(days=30), end_date=date.today() + timedelta(days=40),
+                price=1000.00, image_file=self.image_file,
+            )
+        thread.join(5)
+        
+        self.assertEqual(released, [False])
+        self.assertTrue(default_storage.exists(self.image_file))
+    
+    def test_lock_requires_a_transaction(self):
+        with self.assertRaises(transaction.TransactionManagementError):
+            lock_image(self.image_file)
+
+
+class MediaServingTestCase(TestCase):
+    """
+    Tests for the media view: validators, cache headers, ranges and offload modes.
+    """
+    
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, MEDIA_SERVING_MODE='django'))
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        
+        self.content = bytes(range(256)) * 4
+        self.hashed_path = content_addressed_name('cd' * 32, 'photo.jpg')
+        default_storage.save(self.hashed_path, ContentFile(self.content))
+        default_storage.save('images/vacation_images/rome.jpg', ContentFile(self.content))
+        self.client = Client()
+    
+    def get(self, path, **headers):
+        return self.client.get(f'/media/{path}', headers=headers)
+    
+    def test_full_response_headers(self):
+        response = self.get(self.hashed_path)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        
+        legacy = self.get('images/vacation_images/rome.jpg')
+        self.assertEqual(legacy['Cache-Control'], 'public, max-age=3600')
+    
+    def test_matching_etag_returns_304(self):
+        etag = self.get(self.hashed_path)['ETag']
+        
+        response = self.get(self.hashed_path, If_None_Match=etag)
+        
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+    
+    def test_byte_ranges(self):
+        response = self.get(self.hashed_path, Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        
+        suffix = self.get(self.hashed_path, Range='bytes=-5')
+        self.assertEqual(suffix.status_code, 206)
+        self.assertEqual(b''.join(suffix.streaming_content), self.content[-5:])
+        
+        open_ended = self.get(self.hashed_path, Range='bytes=1000-')
+        self.assertEqual(b''.join(open_ended.streaming_content), self.content[1000:])
+        
+        unsatisfiable = self.get(self.hashed_path, Range='bytes=5000-6000')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], f'bytes */{len(self.content)}')
+    
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.get(self.hashed_path, Range='bytes=0-9', If_Range='"stale"')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+    
+    def test_offload_modes(self):
+        with override_settings(MEDIA_SERVING_MODE='x-accel', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self.get(self.hashed_path)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.hashed_path}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        
+        with override_settings(MEDIA_SERVING_MODE='x-sendfile'):
+            response = self.get(self.hashed_path)
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media_root, self.hashed_path))
+    
+    def test_missing_and_traversal_paths_are_404(self):
+        self.assertEqual(self.get('images/vacation_images/missing.jpg').status_code, 404)
+        self.assertEqual(self.get('images/vacation_images').status_code, 404)
+        self.assertEqual(self.get('../etc/passwd').status_code, 404)
+
+
+class RoleCacheTestCase(TestCase):
+    """
+    Tests for eager role loading and the in-process role cache.
+    """
+    
+    def setUp(self):
+        self.admin_role = Role.objects.create(role_name='admin')
+        self.user = User.objects.create_user(
+            email='admin@test.com',
+            password='testpass123',
+            first_name='Admin',
+            last_name='Test',
+            role=self.admin_role
+        )
+    
+    def test_get_user_loads_role_in_one_query(self):
+        with self.assertNumQueries(1):
+            user = EmailBackend().get_user(self.user.pk)
+            self.assertTrue(user.is_admin)
+    
+    def test_is_admin_uses_role_cache(self):
+        Role.objects.get_cached(self.admin_role.pk)
+        user = User.objects.get(pk=self.user.pk)
+        
+        with self.assertNumQueries(0):
+            self.assertTrue(user.is_admin)
+    
+    def test_role_change_clears_cache(self):
+        Role.objects.get_cached(self.admin_role.pk)
+        
+        self.admin_role.role_name = 'user'
+        self.admin_role.save()
+        user = User.objects.get(pk=self.user.pk)
+        
+        # The cache reloads the roles table once
+        with self.assertNumQueries(1):
+            self.assertFalse(user.is_admin)
+
+
+@override_settings(USER_SNAPSHOT_AUTH=True, VACATION_PAGE_SIZE=50)
+class UserSnapshotAuthTestCase(TestCase):
+    """
+    Tests for resolving request.user from a cached user snapshot.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.user_role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='Regular',
+            last_name='User',
+            role=self.user_role
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+    
+    def test_cached_snapshot_skips_user_query(self):
+        self.client.get(reverse('vacation_list'))
+        
+        # session, ETag validator and the vacation query
+        with self.assertNumQueries(VacationListQueryTestCase.LIST_QUERY_BUDGET - 1):
+            response = self.client.get(reverse('vacation_list'))
+        self.assertEqual(response.context['user'].email, 'user@test.com')
+        self.assertFalse(response.context['user'].is_admin)
+    
+    def test_user_save_invalidates_snapshot(self):
+        self.client.get(reverse('vacation_list'))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(first_name='Renamed')
+            User.objects.get(pk=self.user.pk).save()
+        
+        response = self.client.get(reverse('vacation_list'))
+        self.assertEqual(response.context['user'].first_name, 'Renamed')
+    
+    def test_password_change_logs_out_old_sessions(self):
+        self.client.get(reverse('vacation_list'))
+        
+        self.user.set_password('newpass456')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        
+        response = self.client.get(reverse('vacation_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(reverse('login')))
+    
+    def test_role_change_invalidates_snapshots(self):
+        self.client.get(reverse('vacation_list'))
+        
+        self.user_role.role_name = 'admin'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user_role.save()
+        
+        response = self.client.get(reverse('vacation_list'))
+        self.assertTrue(response.context['user'].is_admin)
+    
+    def test_snapshot_user_save_keeps_password(self):
+        self.client.get(reverse('vacation_list'))
+        snapshot_user = self.client.get(reverse('vacation_list')).context['user']
+        
+        snapshot_user.first_name = 'Changed'
+        snapshot_user.save()
+        
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Changed')
+        self.assertTrue(self.user.check_password('testpass123'))
+
+
+class PasswordHashingPoolTestCase(TestCase):
+    """
+    Tests for the bounded password hashing pool and the async login views.
+    """
+    
+    def setUp(self):
+        self.user_role = Role.objects.create(role_name='user')
+        User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='Regular',
+            last_name='User',
+            role=self.user_role
+        )
+    
+    def occupy_pool(self, executor):
+        """
+        Start a hash that blocks until the returned event is set.
+        """
+        release = threading.Event()
+        started = threading.Event()
+        
+        def blocker():
+            started.set()
+            release.wait(5)
+        
+        thread = threading.Thread(target=async_to_sync(executor.run), args=(blocker,))
+        thread.start()
+        started.wait(5)
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        return release
+    
+    def test_full_pool_rejects_and_counts(self):
+        executor = BoundedHashingExecutor(max_workers=1, max_queue=0)
+        self.addCleanup(executor.shutdown)
+        release = self.occupy_pool(executor)
+        
+        with self.assertRaises(HashingBusy):
+            async_to_sync(executor.run)(len, 'x')
+        release.set()
+        
+        metrics = executor.metrics()
+        self.assertEqual(metrics['rejected'], 1)
+        self.assertEqual(metrics['peak_in_flight'], 1)
+    
+    def test_gauges_follow_the_pool(self):
+        executor = BoundedHashingExecutor(max_workers=1, max_queue=1)
+        self.addCleanup(executor.shutdown)
+        running = REGISTRY.get_sample_value('vacations_password_hashing_tasks', {'state': 'running'})
+        queued = REGISTRY.get_sample_value('vacations_password_hashing_tasks', {'state': 'queued'})
+    
+        release = self.occupy_pool(executor)
+        self.assertEqual(REGISTRY.get_sample_value('vacations_password_hashing_tasks', {'state': 'running'}), running + 1)
+        self.assertEqual(REGISTRY.get_sample_value('vacations_password_hashing_tasks', {'state': 'queued'}), queued)
+        release.set()
+        # The single worker only takes this once the blocker has fully finished
+        async_to_sync(executor.run)(len, 'x')
+    
+        self.assertEqual(REGISTRY.get_sample_value('vacations_password_hashing_tasks', {'state': 'running'}), running)
+        self.assertEqual(REGISTRY.get_sample_value('vacations_password_hashing_tasks', {'state': 'queued'}), queued)
+    
+    @override_settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE_SIZE=0)
+    def test_login_returns_503_when_pool_is_full(self):
+        self.occupy_pool(get_executor())
+        
+        response = self.client.post(reverse('login'), {'email': 'user@test.com', 'password': 'testpass123'})
+        
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertNotIn('_auth_user_id', self.client.session)
+    
+    def test_async_login_and_failed_login(self):
+        response = self.client.post(reverse('login'), {'email': 'user@test.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        
+        response = self.client.post(reverse('login'), {'email': 'user@test.com', 'password': 'testpass123'})
+        self.assertRedirects(response, reverse('vacation_list'), fetch_redirect_response=False)
+        self.assertIn('_auth_user_id', self.client.session)
+    
+    def test_register_hashes_on_pool(self):
+        completed = get_executor().metrics()['completed']
+        
+        response = self.client.post(reverse('register'), {
+            'first_name': 'New',
+            'last_name': 'User',
+            'email': 'new@test.com',
+            'password1': 'Str0ngPass!23',
+            'password2': 'Str0ngPass!23',
+        })
+        
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(User.objects.get(email='new@test.com').check_password('Str0ngPass!23'))
+        self.assertEqual(get_executor().metrics()['completed'], completed + 1)
+
+
+@override_settings(
+    AUTH_THROTTLE_ENABLED=True,
+    AUTH_THROTTLE_IP_BUCKET=(100, 60),
+    AUTH_THROTTLE_EMAIL_BUCKET=(3, 300),
+    PASSWORD_HASHES_PER_SECOND=100,
+)
+class AuthThrottleTestCase(TestCase):
+    """
+    Tests for token-bucket throttling of login and registration attempts.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user_role = Role.objects.create(role_name='user')
+        User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='Regular',
+            last_name='User',
+            role=user_role
+        )
+    
+    def attempt_login(self, email='user@test.com', password='wrong'):
+        return self.client.post(reverse('login'), {'email': email, 'password': password})
+    
+    def test_bucket_refills_over_time(self):
+        bucket = TokenBucket('test', capacity=2, per_seconds=60)
+        
+        self.assertEqual(bucket.consume('key'), 0)
+        self.assertEqual(bucket.consume('key'), 0)
+        self.assertAlmostEqual(bucket.consume('key'), 30, delta=1)
+        
+        # Pretend the last update was 30 seconds ago: one token is back
+        tokens, updated_at = cache.get(bucket.cache_key('key'))
+        cache.set(bucket.cache_key('key'), (tokens, updated_at - 30))
+        self.assertEqual(bucket.consume('key'), 0)
+    
+    def test_email_limit_rejects_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.attempt_login().status_code, 200)
+        completed = get_executor().metrics()['completed']
+        
+        response = self.attempt_login(password='testpass123')
+        
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(get_executor().metrics()['completed'], completed)
+        self.assertNotIn('_auth_user_id', self.client.session)
+        
+        # Other emails from the same IP are unaffected
+        self.assertEqual(self.attempt_login(email='other@test.com').status_code, 200)
+    
+    @override_settings(AUTH_THROTTLE_IP_BUCKET=(2, 60))
+    def test_ip_limit_covers_registration(self):
+        self.attempt_login(email='a@test.com')
+        self.attempt_login(email='b@test.com')
+        
+        response = self.client.post(reverse('register'), {'email': 'c@test.com'})
+        
+        self.assertEqual(response.status_code, 429)
+    
+    @override_settings(PASSWORD_HASHES_PER_SECOND=0.01)
+    def test_global_hashing_budget(self):
+        # Freeze the bucket clock so a slow hash doesn't refill the budget
+        with mock.patch('vacations.throttling.time.time', return_value=1_000_000.0):
+            self.assertEqual(self.attempt_login(email='a@test.com').status_code, 200)
+            
+            response = self.attempt_login(email='b@test.com')
+        
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(int(response['Retry-After']), 100)
+    
+    @override_settings(PASSWORD_HASHES_PER_SECOND=0)
+    def test_zero_hashing_budget_means_no_limit(self):
+        self.assertEqual(self.attempt_login(email='a@test.com').status_code, 200)
+        self.assertEqual(self.attempt_login(email='b@test.com').status_code, 200)
+    
+    @override_settings(AUTH_THROTTLE_IP_BUCKET=(1, 60), CLIENT_IP_HEADER='HTTP_X_FORWARDED_FOR',
+                       TRUSTED_PROXY_IPS=['10.0.0.1'])
+    def test_ip_limit_uses_forwarded_address_from_trusted_proxy(self):
+        def attempt(email, remote_addr, forwarded):
+            return self.client.post(
+                reverse('login'), {'email': email, 'password': 'wrong'},
+                REMOTE_ADDR=remote_addr, HTTP_X_FORWARDED_FOR=forwarded,
+            ).status_code
+        
+        # Two clients behind the proxy get separate buckets
+        self.assertEqual(attempt('a@test.com', '10.0.0.1', '203.0.113.9, 198.51.100.1'), 200)
+        self.assertEqual(attempt('b@test.com', '10.0.0.1', '198.51.100.2'), 200)
+        self.assertEqual(attempt('c@test.com', '10.0.0.1', '198.51.100.1'), 429)
+        
+        # The header is ignored from untrusted addresses
+        self.assertEqual(attempt('d@test.com', '192.0.2.7', '198.51.100.3'), 200)
+        self.assertEqual(attempt('e@test.com', '192.0.2.7', '198.51.100.4'), 429)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTestCase(TestCase):
+    """
+    Tests for read-replica routing decisions and the primary pin cookie.
+    """
+    
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+    
+    def test_reads_use_replica_only_inside_context(self):
+        self.assertEqual(self.router.db_for_read(Vacation), DEFAULT_DB_ALIAS)
+        
+        with read_from_replica(self.factory.get('/')):
+            self.assertIn(self.router.db_for_read(Vacation), ['replica_1', 'replica_2'])
+            self.assertEqual(self.router.db_for_write(Vacation), DEFAULT_DB_ALIAS)
+        
+        self.assertEqual(self.router.db_for_read(Vacation), DEFAULT_DB_ALIAS)
+    
+    def test_unsafe_and_pinned_requests_read_primary(self):
+        pinned = self.factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        
+        for request in (self.factory.post('/'), pinned):
+            with read_from_replica(request):
+                self.assertEqual(self.router.db_for_read(Vacation), DEFAULT_DB_ALIAS)
+    
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica_1', 'vacations'))
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'vacations'))
+    
+    def test_write_pins_client_to_primary(self):
+        country = Country.objects.create(country_name='Test Country')
+        user_role = Role.objects.create(role_name='user')
+        User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='Regular',
+            last_name='User',
+            role=user_role
+        )
+        vacation = Vacation.objects.create(
+            country=country,
+            description='Beach vacation',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=40),
+            price=1000.00,
+            image_file='test.jpg'
+        )
+        self.client.login(email='user@test.com', password='testpass123')
+        
+        response = self.client.post(reverse('toggle_like', args=[vacation.id]))
+        
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+        # The replica aliases do not exist here, so this only works from the primary
+        self.assertEqual(self.client.get(reverse('vacation_feed')).json()['vacations'][0]['like_count'], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaQueryTestCase(TransactionTestCase):
+    """
+    Runs the feed against two replica aliases that mirror the test database.
+    """
+    replica_aliases = ('replica_1', 'replica_2')
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Registered on the connection handler once the test database exists:
+        # overriding DATABASES does not add connections. Each alias is a second
+        # connection to the test database, the way TEST MIRROR sets replicas up.
+        for alias in cls.replica_aliases:
+            connections.settings[alias] = {
+                **copy.deepcopy(connections[DEFAULT_DB_ALIAS].settings_dict),
+                'TEST': {'MIRROR': DEFAULT_DB_ALIAS},
+            }
+            cls.addClassCleanup(cls.remove_alias, alias)
+        cls.databases = {DEFAULT_DB_ALIAS, *cls.replica_aliases}
+    
+    @classmethod
+    def remove_alias(cls, alias):
+        cls.databases = {DEFAULT_DB_ALIAS}
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+    
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        country = Country.objects.create(country_name='Test Country')
+        user_role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='user@test.com',
+            password='testpass123',
+            first_name='Regular',
+            last_name='User',
+            role=user_role
+        )
+        self.vacation = Vacation.objects.create(
+            country=country,
+            description='Beach vacation',
+            start_date=date.today() + timedelta(days=30),
+            end_date=date.today() + timedelta(days=40),
+            price=1000.00,
+            image_file='test.jpg'
+        )
+        self.client.login(email='user@test.com', password='testpass123')
+    
+    def test_lagging_replica_cannot_overwrite_newer_cards(self):
+        lagged_row = Vacation.objects.with_like_info(self.user).get(pk=self.vacation.pk)
+        self.vacation.description = 'Edited description'
+        self.vacation.save()
+        
+        # A replica that has not applied the edit yet renders and caches the old card
+        lagged_page = KeysetPage([lagged_row], None)
+        with mock.patch('vacations.views.apaginate_vacations', mock.AsyncMock(return_value=lagged_page)):
+            self.assertContains(self.client.get(reverse('vacation_list')), 'Beach vacation')
+        
+        # Readers of the current row never get that card
+        response = self.client.get(reverse('vacation_list'))
+        self.assertContains(response, 'Edited description')
+        self.assertNotContains(response, 'Beach vacation')
+    
+    def test_list_reads_from_replica(self):
+        with CaptureQueriesContext(connections[settings.DATABASE_REPLICAS[0]]) as first, \
+                CaptureQueriesContext(connections[settings.DATABASE_REPLICAS[1]]) as second:
+            for _ in range(20):
+                self.assertEqual(len(self.client.get(reverse('vacation_feed')).json()['vacations']), 1)
+        
+        self.assertTrue(first.captured_queries)
+        self.assertTrue(second.captured_queries)
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    EXPLAINs the list, admin and like queries on a seeded dataset and fails
+    if vacations or likes are read with a sequential scan.
+    
+    PostgreSQL prefers sequential scans on small tables, so the plans are
+    taken with enable_seqscan off: a Seq Scan that survives that has no
+    usable index behind it.
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        user_role = Role.objects.create(role_name='user')
+        countries = Country.objects.bulk_create(Country(country_name=f'Country {i}') for i in range(10))
+        users = User.objects.bulk_create(
+            User(email=f'user{i}@test.com', first_name='User', last_name=str(i), role=user_role)
+            for i in range(40)
+        )
+        start = date.today() + timedelta(days=30)
+        vacations = Vacation.objects.bulk_create(
+            Vacation(
+                country=countries[i % len(countries)],
+                description=f'Vacation {i}',
+                start_date=start + timedelta(days=i % 90),
+                end_date=start + timedelta(days=i % 90 + 7),
+                price=1000,
+                image_file=f'images/vacation_images/{i}.jpg',
+            )
+            for i in range(600)
+        )
+        Like.objects.bulk_create(
+            (Like(user=users[i % len(users)], vacation=vacations[(i * 7) % len(vacations)])
+             for i in range(2000)),
+            ignore_conflicts=True,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.user = users[0]
+        cls.vacation = vacations[300]
+        cls.country = countries[3]
+    
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                return queryset.explain()
+        return queryset.explain()
+    
+    def assert_uses_indexes(self, queryset):
+        plan = self.explain(queryset)
+        if connection.vendor == 'postgresql':
+            self.assertNotRegex(plan, r'Seq Scan on (vacations|likes)\b')
+        elif connection.vendor == 'sqlite':
+            self.assertNotRegex(plan, r'SCAN (vacations|likes)(?! USING (COVERING )?INDEX)')
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plan)
+        return plan
+    
+    def test_vacation_list_pages(self):
+        first_page = keyset_queryset(Vacation.objects.with_like_info(self.user), None)[:13]
+        self.assertIn('vacations_start_id_idx', self.assert_uses_indexes(first_page))
+        
+        cursor = encode_cursor(self.vacation.start_date, self.vacation.pk)
+        later_page = keyset_queryset(Vacation.objects.with_like_info(self.user), cursor)[:13]
+        self.assertIn('vacations_start_id_idx', self.assert_uses_indexes(later_page))
+    
+    def test_admin_country_filter(self):
+        # The changelist's own queryset, with the ordering the admin adds ('start_date', '-pk')
+        request = RequestFactory().get('/admin/vacations/vacation/', {'country__id__exact': self.country.pk})
+        request.user = User(is_staff=True, is_superuser=True)
+        changelist = admin.site._registry[Vacation].get_changelist_instance(request)
+        queryset = changelist.queryset[:changelist.list_per_page]
+        
+        self.assertEqual(changelist.queryset.query.order_by[-2:], ('start_date', '-pk'))
+        self.assertIn('vacations_country_start_idx', self.assert_uses_indexes(queryset))
+    
+    def test_like_lookups(self):
+        self.assert_uses_indexes(Like.objects.filter(vacation=self.vacation))
+        self.assert_uses_indexes(Like.objects.filter(user=self.user, vacation=self.vacation))
+    
+    def test_validator_and_image_reference_lookups(self):
+        self.assert_uses_indexes(Vacation.objects.order_by('-updated_at')[:1])
+        # Unordered, like the exists() check in release_image
+        self.assert_uses_indexes(Vacation.objects.filter(image_file=self.vacation.image_file).order_by())
+
+
+class ScalePopulateTestCase(TestCase):
+    """
+    Tests for the synthetic dataset generated by ``populate_db --scale``.
+    """
+    
+    def populate(self, seed):
+        call_command(
+            'populate_db', '--scale', '--users', '200', '--vacations', '50', '--likes', '1500',
+            '--seed', str(seed), '--batch-size', '64', stdout=StringIO(),
+        )
+        return list(
+            Vacation.objects.filter(description__in=synthetic.DESCRIPTIONS)
+            .order_by('pk')
+            .values_list('start_date', 'price', 'like_count')
+        )
+    
+    def test_generates_consistent_skewed_data(self):
+        rows = self.populate(seed=7)
+        
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(User.objects.filter(email__startswith='scale-7-').count(), 200)
+        self.assertEqual(Vacation.objects.recount_likes(dry_run=True), 0)
+        like_counts = sorted((row[2] for row in rows), reverse=True)
+        self.assertEqual(Like.objects.count(), sum(like_counts))
+        # Zipf-like: the most liked vacation has far more likes than the median one
+        self.assertGreater(like_counts[0], 5 * like_counts[len(like_counts) // 2])
+    
+    def test_same_seed_gives_same_data(self):
+        with transaction.atomic():
+            first = self.populate(seed=7)
+            transaction.set_rollback(True)
+        
+        self.assertEqual(self.populate(seed=7), first)
+    
+    def test_refuses_to_generate_twice(self):
+        self.populate(seed=7)
+        
+        with self.assertRaises(CommandError):
+            self.populate(seed=7)
+
+
+
+class BenchmarkingTestCase(TestCase):
+    
+    def setUp(self):
+        role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='bench@test.com', password='testpass123', first_name='Bench', last_name='User', role=role
+        )
+        self.client.force_login(self.user)
+    
+    def test_percentile_uses_nearest_rank(self):
+        values = [float(value) for value in range(1, 101)]
+        
+        self.assertEqual(percentile(values, 0.50), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([3.0], 0.95), 3.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+    
+    def test_benchmark_endpoint_counts_queries_per_request(self):
+        url = reverse('vacation_list')
+        
+        result = benchmark_endpoint(lambda: self.client.get(url), iterations=4, warmup=1, memory_samples=1)
+        
+        self.assertEqual(result['requests'], 4)
+        self.assertEqual(result['status_codes'], {'200': 4})
+        # Matches VacationListQueryTestCase.LIST_QUERY_BUDGET
+        self.assertEqual(result['queries_per_request'], 4)
+        self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(result['peak_memory_kib'], 0)
+    
+    def test_compare_results_reports_relative_change(self):
+        baseline = {'revision': 'abc123', 'endpoints': {'list': {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries_per_request': 4}}}
+        current = {'endpoints': {
+            'list': {'p50_ms': 5.0, 'p95_ms': 20.0, 'queries_per_request': 5},
+            'login': {'p50_ms': 1.0, 'p95_ms': 1.0, 'queries_per_request': 1},
+        }}
+        
+        lines = compare_results(current, baseline)
+        
+        self.assertIn('abc123', lines[0])
+        self.assertIn('p50_ms -50.0%', lines[1])
+        self.assertIn('queries_per_request +25.0%', lines[1])
+        self.assertIn('login: not in baseline', lines[2])
+
+
+
+class RequestTimingTestCase(TestCase):
+    
+    def setUp(self):
+        role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='timing@test.com', password='testpass123', first_name='Timing', last_name='User', role=role
+        )
+        self.client.force_login(self.user)
+    
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request_reports_server_timing_and_log(self):
+        with self.assertLogs('vacations.middleware', level='INFO') as logs:
+            response = self.client.get(reverse('vacation_list'))
+        
+        metrics = dict(
+            (part.split(';')[0].strip(), part) for part in response['Server-Timing'].split(',')
+        )
+        self.assertEqual(set(metrics), {'db', 'tpl', 'total'})
+        self.assertIn('desc="4 queries"', metrics['db'])
+        record = logs.records[0]
+        self.assertEqual(record.path, '/')
+        self.assertEqual(record.queries, 4)
+        self.assertGreater(record.template_ms, 0)
+        self.assertLessEqual(record.db_ms + record.template_ms, record.total_ms)
+    
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_untouched(self):
+        response = self.client.get(reverse('vacation_list'))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+    
+    def test_included_templates_are_timed_once(self):
+        template = Template('{% for i in items %}{% include inner %}{% endfor %}')
+        inner = Template('{{ i }}')
+        
+        with record_request() as timings:
+            started = time.perf_counter()
+            template.render(TemplateContext({'items': range(50), 'inner': inner}))
+            elapsed = time.perf_counter() - started
+        
+        self.assertGreater(timings.template_seconds, 0)
+        self.assertLessEqual(timings.template_seconds, elapsed)
+
+
+
+class ProfilingTestCase(TestCase):
+    
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='profile@test.com', password='testpass123', first_name='Profile', last_name='User', role=role
+        )
+        self.client.force_login(self.user)
+    
+    def profiled_files(self, url_name):
+        directory = os.path.join(self.profile_dir, url_name)
+        return os.listdir(directory) if os.path.isdir(directory) else []
+    
+    def test_sampler_collects_collapsed_stacks(self):
+        def busy_loop():
+            deadline = time.perf_counter() + 0.1
+            while time.perf_counter() < deadline:
+                pass
+        
+        sampler = StackSampler(0.001).start()
+        busy_loop()
+        stacks = sampler.stop()
+        
+        self.assertTrue(stacks)
+        self_samples, total_samples = hot_functions(stacks)
+        hottest = self_samples.most_common(1)[0][0]
+        self.assertTrue(hottest.startswith('busy_loop (vacations/tests.py:'))
+        self.assertEqual(total_samples[hottest], sum(stacks.values()))
+    
+    def test_collapsed_files_round_trip(self):
+        write_collapsed(self.profile_dir, 'vacation_list', {'a;b': 3, 'a;c': 1})
+        write_collapsed(self.profile_dir, 'vacation_list', {'a;b': 2})
+        
+        files = [os.path.join(self.profile_dir, 'vacation_list', name) for name in self.profiled_files('vacation_list')]
+        self.assertEqual(read_collapsed(files), {'a;b': 5, 'a;c': 1})
+        self.assertIsNone(write_collapsed(self.profile_dir, 'toggle_like', {}))
+    
+    def test_disabled_by_default(self):
+        with override_settings(PROFILING_DIR=self.profile_dir, PROFILING_SAMPLE_RATE=1):
+            self.client.get(reverse('vacation_list'))
+        
+        self.assertEqual(os.listdir(self.profile_dir), [])
+    
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0, PROFILING_INTERVAL=0.0001)
+    def test_signed_header_forces_profiling(self):
+        with override_settings(PROFILING_DIR=self.profile_dir):
+            self.client.get(reverse('vacation_list'), HTTP_X_PROFILE='forged')
+            self.assertEqual(self.profiled_files('vacation_list'), [])
+            
+            for _ in range(5):
+                self.client.get(reverse('vacation_list'), HTTP_X_PROFILE=issue_profile_token())
+        
+        self.assertTrue(self.profiled_files('vacation_list'))
+    
+    def test_profile_report_lists_hot_functions(self):
+        write_collapsed(self.profile_dir, 'vacation_list', {'main;render;resolve': 6, 'main;query': 4})
+        write_collapsed(self.profile_dir, 'toggle_like', {'main;query': 10})
+        output = os.path.join(self.profile_dir, 'merged.folded')
+        
+        out = StringIO()
+        call_command('profile_report', 'vacation_list', dir=self.profile_dir, output=output, stdout=out)
+        
+        lines = out.getvalue().splitlines()
+        self.assertIn('10 samples from 1 requests', lines[0])
+        self.assertTrue(lines[2].endswith('resolve'))
+        self.assertIn('60.0%', lines[2])
+        with open(output) as handle:
+            self.assertEqual(handle.read(), 'main;render;resolve 6\nmain;query 4\n')
+        with self.assertRaises(CommandError):
+            call_command('profile_report', 'missing', dir=self.profile_dir, stdout=StringIO())
+
+
+
+class QueryStatsTestCase(TestCase):
+    
+    def setUp(self):
+        self.admin_role = Role.objects.create(role_name='admin')
+        self.user_role = Role.objects.create(role_name='user')
+        self.admin = User.objects.create_user(
+            email='stats-admin@test.com', password='testpass123', first_name='Stats', last_name='Admin', role=self.admin_role
+        )
+        self.user = User.objects.create_user(
+            email='stats@test.com', password='testpass123', first_name='Stats', last_name='User', role=self.user_role
+        )
+        query_stats.reset()
+        self.addCleanup(query_stats.reset)
+    
+    def test_fingerprint_strips_literals(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE name = 'O''Brien' AND id IN (%s, %s, %s) LIMIT 21"),
+            'SELECT * FROM t WHERE name = ? AND id IN (...) LIMIT ?',
+        )
+        self.assertEqual(
+            fingerprint('INSERT INTO "t1" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "t1" ("a", "b") VALUES (...)',
+        )
+        self.assertEqual(fingerprint('SELECT  1\n  FROM t'), fingerprint('SELECT 2 FROM t'))
+    
+    def test_queries_are_grouped_by_view_and_fingerprint(self):
+        self.client.force_login(self.user)
+        for _ in range(3):
+            self.client.get(reverse('vacation_list'))
+        
+        entries = [entry for entry in query_stats.snapshot() if entry['view'] == 'vacation_list']
+        self.assertTrue(entries)
+        self.assertTrue(all(entry['count'] == 3 for entry in entries))
+        self.assertTrue(all(entry['max_ms'] <= entry['total_ms'] for entry in entries))
+        self.assertTrue(any('FROM "vacations"' in entry['fingerprint'] for entry in entries))
+    
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged_with_view_name(self):
+        self.client.force_login(self.user)
+        
+        with self.assertLogs('vacations.querystats', level='WARNING') as logs:
+            self.client.get(reverse('vacation_list'))
+        
+        self.assertTrue(all(record.view == 'vacation_list' for record in logs.records))
+    
+    @override_settings(QUERY_STATS_MAX_FINGERPRINTS=2)
+    def test_distinct_fingerprints_are_capped(self):
+        stats = QueryStats()
+        for index in range(5):
+            stats.record('view', f'SELECT {index} FROM t{index}', 0.001)
+        
+        entries = {entry['fingerprint']: entry['count'] for entry in stats.snapshot()}
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(entries[OVERFLOW_FINGERPRINT], 3)
+    
+    def test_metrics_endpoint_is_admin_only(self):
+        url = reverse('query_metrics')
+        self.client.force_login(self.user)
+        self.client.get(reverse('vacation_list'))
+        
+        self.assertEqual(self.client.get(url).status_code, 403)
+        
+        self.client.force_login(self.admin)
+        response = self.client.get(url, {'view': 'vacation_list'})
+        self.assertEqual(response.status_code, 200)
+        entries = response.json()['queries']
+        self.assertTrue(entries)
+        self.assertEqual({entry['view'] for entry in entries}, {'vacation_list'})
+
+
+
+class QueuedLoggingTestCase(unittest.TestCase):
+    
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+        self.path = os.path.join(self.log_dir, 'app.log')
+        self.logger = logging.getLogger('vacations.tests.queued_logging')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+    
+    def attach(self, **kwargs):
+        handler = QueuedRotatingFileHandler(self.path, **kwargs)
+        handler.setFormatter(JSONFormatter())
+        self.logger.addHandler(handler)
+        self.addCleanup(handler.close)
+        self.addCleanup(self.logger.removeHandler, handler)
+        return handler
+    
+    def read_lines(self, path=None):
+        with open(path or self.path) as handle:
+            return [json.loads(line) for line in handle]
+    
+    def test_records_are_written_as_json_lines(self):
+        handler = self.attach()
+        self.logger.info('request %s', 'done', extra={'path': '/', 'queries': 4})
+        try:
+            raise ValueError('bad')
+        except ValueError:
+            self.logger.exception('failed')
+        handler.flush()
+        
+        first, second = self.read_lines()
+        self.assertEqual(first['message'], 'request done')
+        self.assertEqual(first['level'], 'INFO')
+        self.assertEqual((first['path'], first['queries']), ('/', 4))
+        self.assertIn('ValueError: bad', second['exception'])
+    
+    def test_log_file_rotates_by_size(self):
+        handler = self.attach(max_bytes=2000, backup_count=2)
+        for index in range(100):
+            self.logger.info('record %d', index)
+            handler.flush()
+        
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertTrue(os.path.exists(self.path + '.2'))
+        self.assertFalse(os.path.exists(self.path + '.3'))
+        self.assertLess(os.path.getsize(self.path), 2000)
+        self.assertEqual(self.read_lines()[-1]['message'], 'record 99')
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = self.attach(queue_size=5)
+        handler.listener.stop()
+        for index in range(8):
+            self.logger.info('record %d', index)
+        
+        self.assertEqual(handler.dropped, 3)
+        handler.listener.start()
+        handler.flush()
+        lines = self.read_lines()
+        self.assertEqual([line['message'] for line in lines[:-1]], [f'record {index}' for index in range(5)])
+        # The drops are reported in the file as soon as the listener catches up
+        self.assertEqual((lines[-1]['level'], lines[-1]['dropped']), ('WARNING', 3))
+    
+    def test_project_logging_config_loads(self):
+        # From Python 3.12 dictConfig configures QueueHandler subclasses
+        # specially, which this handler must not trip over
+        script = (
+            'import logging, logging.config, django; django.setup()\n'
+            'from django.conf import settings\n'
+            'logging.config.dictConfig(settings.LOGGING)\n'
+            'logging.getLogger("vacations").info("configured")\n'
+            'logging.shutdown()\n'
+        )
+        subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, check=True,
+            env={**os.environ, 'LOG_FILE': self.path},
+        )
+        
+        self.assertEqual(self.read_lines()[-1]['message'], 'configured')
+    
+    def test_reserved_slots_keep_errors(self):
+        handler = self.attach(queue_size=5, reserve=2)
+        handler.listener.stop()
+        for index in range(5):
+            self.logger.info('record %d', index)
+        for index in range(3):
+            self.logger.error('error %d', index)
+        
+        self.assertEqual(handler.dropped, 3)
+        handler.listener.start()
+        handler.flush()
+        self.assertEqual(
+            [line['message'] for line in self.read_lines()],
+            ['record 0', 'record 1', 'record 2', 'error 0', 'error 1', '3 log records dropped: log queue was full'],
+        )
+    
+    def test_pid_placeholder_and_single_fork_hook(self):
+        with mock.patch('os.register_at_fork') as register_at_fork:
+            handler = QueuedRotatingFileHandler(os.path.join(self.log_dir, 'app.{pid}.log'))
+            self.addCleanup(handler.close)
+        
+        # The fork hook is registered once, when the module is imported
+        register_at_fork.assert_not_called()
+        self.assertIn(handler, log_handlers._handlers)
+        self.assertEqual(handler.target.baseFilename, os.path.join(self.log_dir, f'app.{os.getpid()}.log'))
+        
+        # A forked worker writes to a file of its own (the parent's listener
+        # thread is still alive here, unlike after a real fork)
+        self.addCleanup(handler.listener.stop)
+        with mock.patch('os.getpid', return_value=4242):
+            handler._restart_after_fork()
+        handler.setFormatter(JSONFormatter())
+        handler.handle(logging.makeLogRecord({'msg': 'from the child', 'levelno': logging.INFO, 'levelname': 'INFO'}))
+        handler.flush()
+        self.assertEqual(self.read_lines(os.path.join(self.log_dir, 'app.4242.log'))[0]['message'], 'from the child')
+
+
+
+class PrometheusMetricsTestCase(TestCase):
+    
+    def setUp(self):
+        self.admin_role = Role.objects.create(role_name='admin')
+        self.user_role = Role.objects.create(role_name='user')
+        self.admin = User.objects.create_user(
+            email='metrics-admin@test.com', password='testpass123', first_name='Metrics', last_name='Admin', role=self.admin_role
+        )
+        self.user = User.objects.create_user(
+            email='metrics@test.com', password='testpass123', first_name='Metrics', last_name='User', role=self.user_role
+        )
+        country = Country.objects.create(country_name='Metricland')
+        self.vacation = Vacation.objects.create(
+            country=country, description='A vacation to measure',
+            start_date=date.today() + timedelta(days=10), end_date=date.today() + timedelta(days=15),
+            price=1000, image_file='images/vacation_images/test.jpg',
+        )
+    
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+    
+    def test_requests_are_counted_per_url_name(self):
+        self.client.force_login(self.user)
+        before = self.sample('vacations_requests_total', view='vacation_list', method='GET', status='200')
+        observed = self.sample('vacations_request_duration_seconds_count', view='vacation_list')
+        
+        self.client.get(reverse('vacation_list'))
+        self.client.get(reverse('vacation_list'))
+        
+        self.assertEqual(self.sample('vacations_requests_total', view='vacation_list', method='GET', status='200'), before + 2)
+        self.assertEqual(self.sample('vacations_request_duration_seconds_count', view='vacation_list'), observed + 2)
+    
+    def test_unknown_methods_share_one_label(self):
+        other = self.sample('vacations_requests_total', view='vacation_list', method='other', status='302')
+        
+        self.client.generic('BREW', reverse('vacation_list'))
+        self.client.generic('FOO123', reverse('vacation_list'))
+        
+        self.assertEqual(self.sample('vacations_requests_total', view='vacation_list', method='other', status='302'), other + 2)
+        self.assertEqual(self.sample('vacations_requests_total', view='vacation_list', method='BREW', status='302'), 0)
+    
+    def test_like_toggles_and_logins_are_counted(self):
+        likes = self.sample('vacations_like_toggles_total', action='like')
+        unlikes = self.sample('vacations_like_toggles_total', action='unlike')
+        failures = self.sample('vacations_login_attempts_total', result='failure')
+        
+        self.client.post(reverse('login'), {'email': 'metrics@test.com', 'password': 'wrong-password'})
+        self.client.force_login(self.user)
+        self.client.post(reverse('toggle_like', args=[self.vacation.pk]))
+        self.client.post(reverse('toggle_like', args=[self.vacation.pk]))
+        
+        self.assertEqual(self.sample('vacations_login_attempts_total', result='failure'), failures + 1)
+        self.assertEqual(self.sample('vacations_like_toggles_total', action='like'), likes + 1)
+        self.assertEqual(self.sample('vacations_like_toggles_total', action='unlike'), unlikes + 1)
+    
+    def test_card_cache_hits_and_misses_are_counted(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        misses = self.sample('vacations_cache_lookups_total', cache='card', result='miss')
+        hits = self.sample('vacations_cache_lookups_total', cache='card', result='hit')
+        
+        self.client.get(reverse('vacation_list'))
+        self.client.get(reverse('vacation_list'))
+        
+        self.assertEqual(self.sample('vacations_cache_lookups_total', cache='card', result='miss'), misses + 1)
+        self.assertEqual(self.sample('vacations_cache_lookups_total', cache='card', result='hit'), hits + 1)
+    
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_endpoint_access(self):
+        url = reverse('metrics')
+        
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.5').status_code, 200)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        
+        self.client.force_login(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('vacations_requests_total{', body)
+        self.assertIn('vacations_password_hashing_tasks{state="queued"}', body)
+    
+    def test_loopback_is_not_trusted_by_default(self):
+        # A reverse proxy on the same host makes every request look local
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+    
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'connection pooling is PostgreSQL only')
+    def test_db_pool_gauges_follow_checkout_and_return(self):
+        from vacations.db.postgresql.base import DatabaseWrapper
+        
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            self.skipTest('psycopg_pool is not installed')
+        pooled = DatabaseWrapper(
+            {**connection.settings_dict, 'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': {'min_size': 1, 'max_size': 1}}},
+            alias='metrics_pool',
+        )
+        self.addCleanup(pooled.close_pool)
+        
+        pooled.ensure_connection()
+        self.assertEqual(self.sample('vacations_db_pool_connections', alias='metrics_pool', state='size'), 1)
+        self.assertEqual(self.sample('vacations_db_pool_connections', alias='metrics_pool', state='available'), 0)
+        pooled.close()
+        self.assertEqual(self.sample('vacations_db_pool_connections', alias='metrics_pool', state='available'), 1)
+    
+    def test_multiprocess_mode_aggregates_worker_processes(self):
+        multiproc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiproc_dir, ignore_errors=True)
+        script = (
+            'import django; django.setup()\n'
+            'from vacations.metrics import LIKE_TOGGLES\n'
+            'LIKE_TOGGLES.labels("like").inc(3)\n'
+        )
+        for _ in range(2):
+            subprocess.run(
+                [sys.executable, '-c', script], cwd=settings.BASE_DIR, check=True,
+                env={**os.environ, 'PROMETHEUS_MULTIPROC_DIR': multiproc_dir},
+            )
+        
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry, path=multiproc_dir)
+        self.assertEqual(registry.get_sample_value('vacations_like_toggles_total', {'action': 'like'}), 6)
+
+
+
+class AsyncReadPathTestCase(TestCase):
+    """
+    Drives the async views through AsyncClient, i.e. Django's async handler
+    with the middleware chain in async mode.
+    """
+    
+    def setUp(self):
+        self.admin_role = Role.objects.create(role_name='admin')
+        self.user_role = Role.objects.create(role_name='user')
+        self.user = User.objects.create_user(
+            email='async@test.com', password='testpass123', first_name='Async', last_name='User', role=self.user_role
+        )
+        self.admin = User.objects.create_user(
+            email='async-admin@test.com', password='testpass123', first_name='Async', last_name='Admin', role=self.admin_role
+        )
+        country = Country.objects.create(country_name='Asyncland')
+        self.vacations = [
+            Vacation.objects.create(
+                country=country, description=f'Async vacation number {index}',
+                start_date=date.today() + timedelta(days=10 + index), end_date=date.today() + timedelta(days=20 + index),
+                price=1000 + index, image_file='images/vacation_images/test.jpg',
+            )
+            for index in range(3)
+        ]
+        self.async_client = AsyncClient()
+    
+    def test_views_are_async(self):
+        from . import views
+        
+        for view in (views.vacation_list_view, views.vacation_feed_view, views.toggle_like_view):
+            self.assertTrue(asyncio.iscoroutinefunction(view), view.__name__)
+    
+    def test_middleware_runs_natively_in_async_mode(self):
+        async def get_response(request):
+            return None
+        
+        middleware = RequestTimingMiddleware(get_response)
+        
+        self.assertIsInstance(middleware, AsyncCapableMiddleware)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertFalse(asyncio.iscoroutinefunction(RequestTimingMiddleware(lambda request: None)))
+    
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_list_renders_and_revalidates(self):
+        async def scenario():
+            await self.async_client.aforce_login(self.admin)
+            response = await self.async_client.get(reverse('vacation_list'))
+            revalidated = await self.async_client.get(
+                reverse('vacation_list'), headers={'if-none-match': response['ETag']}
+            )
+            return response, revalidated
+        
+        response, revalidated = async_to_sync(scenario)()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Async vacation number 2')
+        self.assertContains(response, 'Add Vacation')
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+        self.assertEqual(revalidated.status_code, 304)
+    
+    def test_rendering_runs_off_the_event_loop(self):
+        # Card rendering checks storage and may query; neither may run on the loop
+        def variants_with_query(image_file):
+            Vacation.objects.exists()
+            return {}
+        
+        async def scenario():
+            await self.async_client.aforce_login(self.user)
+            return await self.async_client.get(reverse('vacation_list'))
+        
+        cache.clear()
+        with mock.patch('vacations.templatetags.vacation_images.available_variants', variants_with_query):
+            response = async_to_sync(scenario)()
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Async vacation number 0')
+    
+    def test_feed_pages_with_cursor(self):
+        async def scenario():
+            await self.async_client.aforce_login(self.user)
+            with override_settings(VACATION_PAGE_SIZE=2):
+                first = (await self.async_client.get(reverse('vacation_feed'))).json()
+                second = (await self.async_client.get(reverse('vacation_feed'), {'after': first['next_cursor']})).json()
+            return first, second
+        
+        first, second = async_to_sync(scenario)()
+        
+        self.assertEqual([item['id'] for item in first['vacations']], [v.pk for v in self.vacations[:2]])
+        self.assertEqual([item['id'] for item in second['vacations']], [self.vacations[2].pk])
+        self.assertIsNone(second['next_cursor'])
+    
+    def test_toggle_like(self):
+        url = reverse('toggle_like', args=[self.vacations[0].pk])
+        
+        async def scenario():
+            await self.async_client.aforce_login(self.user)
+            liked = (await self.async_client.post(url)).json()
+            unliked = (await self.async_client.post(url)).json()
+            missing = await self.async_client.post(reverse('toggle_like', args=[0]))
+            return liked, unliked, missing
+        
+        liked, unliked, missing = async_to_sync(scenario)()
+        
+        self.assertEqual((liked['liked'], liked['like_count']), (True, 1))
+        self.assertEqual((unliked['liked'], unliked['like_count']), (False, 0))
+        self.assertEqual(missing.status_code, 404)
@@ -0,0 +1,127 @@
+import hashlib
+import math
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Serializes read-modify-write of bucket state within a process. Across
+# processes sharing a database or memcached cache, two racing requests can
+# both take the last token, so limits may be exceeded by a request or two.
+_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter with its state kept in the Django cache.
+
+    Each key starts with ``capacity`` tokens and regains them at
+    ``capacity / per_seconds`` tokens per second. Only the token count and
+    the time of the last update are stored, so this works with any cache
+    backend, including local memory (per process) and the database cache
+    (shared by every process).
+    """
+
+    def __init__(self, name: str, capacity: float, per_seconds: float):
+        self.name = name
+        self.capacity = capacity
+        self.per_seconds = per_seconds
+        self.rate = capacity / per_seconds
+
+    def cache_key(self, key: str) -> str:
+        return f'vacations:throttle:{self.name}:{key}'
+
+    def consume(self, key: str, tokens: float = 1) -> float:
+        """
+        Take tokens from a key's bucket if it holds enough.
+
+        Args:
+            key: Identity being limited (IP address, email digest, ...)
+            tokens: Tokens the request costs
+
+        Returns:
+            float: 0 if the tokens were taken, else seconds until they will be available
+        """
+        cache_key = self.cache_key(key)
+        with _lock:
+            now = time.time()
+            state = cache.get(cache_key)
+            if state is None:
+                available = self.capacity
+            else:
+                stored, updated_at = state
+                available = min(self.capacity, stored + (now - updated_at) * self.rate)
+            if available < tokens:
+                return (tokens - available) / self.rate
+            # An untouched bucket is full again after per_seconds, so let it expire then
+            cache.set(cache_key, (available - tokens, now), math.ceil(self.per_seconds))
+        return 0.0
+
+
+def email_key(email: str) -> str:
+    # Hashed so arbitrary user input never ends up in a cache key
+    return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+def client_ip(request) -> str:
+    """
+    Return the address of the client, looking through a trusted reverse proxy.
+
+    CLIENT_IP_HEADER is only honoured on requests arriving from one of
+    TRUSTED_PROXY_IPS; anyone else could set it to dodge their own limit.
+    Proxies append to X-Forwarded-For, so its last entry is the address the
+    trusted proxy saw.
+
+    Args:
+        request: HTTP request
+
+    Returns:
+        str: Client IP address ('' if unknown)
+    """
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    if settings.CLIENT_IP_HEADER and remote_addr in settings.TRUSTED_PROXY_IPS:
+        forwarded = request.META.get(settings.CLIENT_IP_HEADER, '').split(',')[-1].strip()
+        if forwarded:
+            return forwarded
+    return remote_addr
+
+
+def check_auth_throttle(request, email: Optional[str] = None) -> float:
+    """
+    Charge a login or registration attempt against its rate limits.
+
+    Runs before any password hashing. The buckets are checked in order: the
+    client IP (see ``client_ip``), the submitted email (if any) and finally
+    the cluster-wide hashing budget of PASSWORD_HASHES_PER_SECOND, which caps
+    the CPU that PBKDF2 can take however many IPs and emails an attack spreads
+    over. The budget lives in the shared cache, so every process draws on the
+    same one (with a local-memory cache each process has its own); 0 or less
+    disables it. Because the IP bucket is charged first, one client alone
+    cannot drain that budget, provided client addresses are seen correctly.
+
+    Args:
+        request: HTTP request of the attempt
+        email: Email address submitted with the attempt
+
+    Returns:
+        float: 0 if the attempt may proceed, else seconds to wait (for Retry-After)
+    """
+    if not settings.AUTH_THROTTLE_ENABLED:
+        return 0.0
+
+    checks = [(TokenBucket('auth-ip', *settings.AUTH_THROTTLE_IP_BUCKET), client_ip(request))]
+    if email:
+        checks.append((TokenBucket('auth-email', *settings.AUTH_THROTTLE_EMAIL_BUCKET), email_key(email)))
+    hashes_per_second = settings.PASSWORD_HASHES_PER_SECOND
+    if hashes_per_second > 0:
+        # A one-second burst of the hashing budget (at least one hash)
+        hash_burst = max(hashes_per_second, 1)
+        checks.append((TokenBucket('password-hashing', hash_burst, hash_burst / hashes_per_second), 'all'))
+
+    for bucket, key in checks:
+        wait = bucket.consume(key)
+        if wait:
+            return wait
+    return 0.0
@@ -0,0 +1,36 @@
+from typing import List
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Upload handler that enforces a per-file size cap while the upload streams in.
+    
+    Installed first in FILE_UPLOAD_HANDLERS, it sees every chunk before the
+    memory/temporary-file handlers store it. A file that grows past
+    VACATION_IMAGE_MAX_UPLOAD_SIZE is skipped on the spot, so an oversized
+    upload never reaches memory or disk in full. Skipped field names are
+    recorded on the request for views to report as form errors.
+    """
+    
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.VACATION_IMAGE_MAX_UPLOAD_SIZE:
+            if not hasattr(self.request, 'rejected_uploads'):
+                self.request.rejected_uploads = []
+            self.request.rejected_uploads.append(self.field_name)
+            raise SkipFile(f'{self.file_name} exceeds the upload size limit')
+        return raw_data
+    
+    def file_complete(self, file_size):
+        return None
+
+
+def rejected_uploads(request) -> List[str]:
+    """
+    Names of file fields that MaxSizeUploadHandler dropped for being too large.
+    """
+    # Accessing FILES runs the multipart parser (and so the handlers) if needed
+    request.FILES
+    return getattr(request, 'rejected_uploads', [])
@@ -11,4 +11,7 @@ urlpatterns = [
     path('edit/<int:vacation_id>/', views.edit_vacation_view, name='edit_vacation'),
     path('delete/<int:vacation_id>/', views.delete_vacation_view, name='delete_vacation'),
     path('like/<int:vacation_id>/', views.toggle_like_view, name='toggle_like'),
+    path('api/vacations/', views.vacation_feed_view, name='vacation_feed'),
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('metrics/queries/', views.query_metrics_view, name='query_metrics'),
 ]
\ No newline at end of file
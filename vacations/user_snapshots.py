@@ -0,0 +1,109 @@
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user as load_session_user
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare
+
+from .metrics import count_cache_lookups
+from .models import Role, User
+
+SNAPSHOT_GENERATION_KEY = 'vacations:user-snapshot-generation'
+# Columns copied into the snapshot; everything else on the user is left deferred
+SNAPSHOT_FIELDS = ('id', 'first_name', 'last_name', 'email', 'role_id', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_snapshot_generation() -> int:
+    """
+    Return the snapshot generation, which changes whenever any role changes.
+
+    Like the like version in cards.py it is a nanosecond timestamp, so a value
+    lost to cache eviction is never handed out again.
+    """
+    return cache.get_or_set(SNAPSHOT_GENERATION_KEY, time.time_ns, timeout=None)
+
+
+def bump_snapshot_generation() -> None:
+    cache.set(SNAPSHOT_GENERATION_KEY, time.time_ns(), timeout=None)
+
+
+def snapshot_cache_key(user_id, generation: int) -> str:
+    return f'vacations:user-snapshot:{generation}:{user_id}'
+
+
+def invalidate_user_snapshot(user_id) -> None:
+    cache.delete(snapshot_cache_key(user_id, get_snapshot_generation()))
+
+
+def build_snapshot(user: User) -> dict:
+    """
+    Compact, cacheable copy of what a request needs to know about a user.
+
+    The session auth hash is kept instead of the password hash, so a session
+    created before a password change never matches the snapshot.
+    """
+    snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    snapshot['role_name'] = user.role.role_name
+    snapshot['session_hash'] = user.get_session_auth_hash()
+    return snapshot
+
+
+def user_from_snapshot(snapshot: dict, backend_path: str) -> User:
+    """
+    Rebuild a User instance from a snapshot without touching the database.
+
+    The instance is created with ``from_db`` so the password and the other
+    columns outside the snapshot are deferred: reading them loads them, and
+    ``save()`` only writes the snapshot columns instead of blanking the rest.
+    """
+    # from_db expects the loaded values in model field order
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in SNAPSHOT_FIELDS]
+    user = User.from_db(DEFAULT_DB_ALIAS, field_names, [snapshot[name] for name in field_names])
+    user.role = Role.from_db(DEFAULT_DB_ALIAS, ['id', 'role_name'], [snapshot['role_id'], snapshot['role_name']])
+    user.backend = backend_path
+    return user
+
+
+def get_user(request):
+    """
+    Resolve the session's user from the snapshot cache, loading it on a miss.
+
+    A snapshot is used only if its session auth hash matches the session and
+    the user is active. Anything else (a miss, a password change, a backend
+    no longer configured) goes through ``django.contrib.auth.get_user``,
+    which verifies or flushes the session as usual, and a fresh snapshot is
+    stored for the next request.
+
+    Args:
+        request: HTTP request with a session
+
+    Returns:
+        User or AnonymousUser
+    """
+    try:
+        user_id = User._meta.pk.to_python(request.session[SESSION_KEY])
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return load_session_user(request)
+
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    generation = get_snapshot_generation()
+    key = snapshot_cache_key(user_id, generation)
+    snapshot: Optional[dict] = cache.get(key)
+    if (
+        snapshot is not None
+        and session_hash
+        and snapshot['is_active']
+        and backend_path in settings.AUTHENTICATION_BACKENDS
+        and constant_time_compare(session_hash, snapshot['session_hash'])
+    ):
+        count_cache_lookups('user_snapshot', 1, 0)
+        return user_from_snapshot(snapshot, backend_path)
+
+    count_cache_lookups('user_snapshot', 0, 1)
+    user = load_session_user(request)
+    if user.is_authenticated:
+        cache.set(key, build_snapshot(user), settings.USER_SNAPSHOT_TIMEOUT)
+    return user
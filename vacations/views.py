@@ -1,60 +1,178 @@
 from typing import Dict, Any, Union
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import authenticate, login, logout
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate, alogin, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.http import JsonResponse, Http404, HttpRequest, HttpResponse, HttpResponseRedirect
-from django.views.decorators.http import require_POST
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_POST, require_safe
+import math
 import os
 from .models import User, Vacation, Like, Role, Country
+from .cards import aattach_card_html
+from .conditional import async_vacation_list_condition
 from .forms import UserRegistrationForm, UserLoginForm, VacationForm
+from .hashing import HashingBusy, amake_password
+from .images import release_image, save_uploaded_image, schedule_variants
+from prometheus_client import CONTENT_TYPE_LATEST
+from .metrics import LOGIN_ATTEMPTS, render_metrics
+from .pagination import apaginate_vacations
+from .querystats import query_stats
+from .routers import use_replica
+from .throttling import check_auth_throttle
+from .uploadhandlers import rejected_uploads
 
 
-def register_view(request: HttpRequest) -> Union[HttpResponse, HttpResponseRedirect]:
+def reject_oversized_uploads(request: HttpRequest, form) -> None:
+    """
+    Turn uploads dropped by MaxSizeUploadHandler into form errors.
+    """
+    limit_mb = settings.VACATION_IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)
+    for field in rejected_uploads(request):
+        form.add_error(field, f'Image files must be smaller than {limit_mb} MB.')
+
+
+HASHING_BUSY_MESSAGE = 'We are handling a lot of sign-ins right now. Please try again in a moment.'
+THROTTLED_MESSAGE = 'Too many attempts. Please wait a moment and try again.'
+
+
+async def render_async(request: HttpRequest, template_name: str, context: Dict[str, Any], status: int = 200) -> HttpResponse:
+    # Template context processors touch the session and request.user, which are sync-only
+    return await sync_to_async(render)(request, template_name, context, status=status)
+
+
+async def load_request_user(request: HttpRequest) -> User:
+    """
+    Resolve request.user with async queries, ahead of code that reads it.
+    
+    request.user is otherwise a lazy object that queries synchronously on
+    first use, which Django refuses on the event loop (the auth context
+    processor reads it while templates render). Loading the user also loads
+    the session, so the messages context processor needs no query either.
+    """
+    request.user = await request.auser()
+    return request.user
+
+
+async def retry_later_response(request: HttpRequest, template_name: str, form, status: int,
+                               retry_after: float, message: str) -> HttpResponse:
+    """
+    Re-render an auth form with a Retry-After header (429 throttled, 503 busy).
+    """
+    messages.error(request, message)
+    response = await render_async(request, template_name, {'form': form}, status=status)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+async def register_view(request: HttpRequest) -> Union[HttpResponse, HttpResponseRedirect]:
+    """
+    Register a new user account and log it in.
+    
+    Async so the password hash runs on the bounded pool in vacations.hashing
+    instead of holding a request worker.
+    
+    Args:
+        request: HTTP request object with registration data
+        
+    Returns:
+        HttpResponse: Rendered registration form, 503 under load, or redirect after sign-up
+    """
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
-        if form.is_valid():
-            user = form.save()
+        retry_after = await sync_to_async(check_auth_throttle)(request)
+        if retry_after:
+            return await retry_later_response(request, 'vacations/register.html', form, 429, retry_after, THROTTLED_MESSAGE)
+        if await sync_to_async(form.is_valid)():
+            try:
+                form.password_hash = await amake_password(form.cleaned_data['password1'])
+            except HashingBusy:
+                return await retry_later_response(request, 'vacations/register.html', form, 503, 1, HASHING_BUSY_MESSAGE)
+            user = await sync_to_async(form.save)()
             messages.success(request, 'Registration successful!')
-            login(request, user, backend='vacations.backends.EmailBackend')
+            await alogin(request, user, backend='vacations.backends.EmailBackend')
             return redirect('vacation_list')
         else:
             messages.error(request, 'Please correct the errors below.')
     else:
         form = UserRegistrationForm()
     
-    return render(request, 'vacations/register.html', {'form': form})
+    return await render_async(request, 'vacations/register.html', {'form': form})
 
 
-def login_view(request: HttpRequest) -> Union[HttpResponse, HttpResponseRedirect]:
-    if request.method == 'POST':
-        form = UserLoginForm(request.POST)
+async def authenticate_and_login(request: HttpRequest, form, template_name: str, error_message: str) -> HttpResponse:
+    """
+    Shared POST handling of the login views.
+    
+    Attempts over the per-IP, per-email or global hashing rate limits get a
+    429 before any password is hashed.
+    
+    Args:
+        request: HTTP request object containing login credentials
+        form: Bound UserLoginForm
+        template_name: Template to re-render on failure
+        error_message: Message shown for wrong credentials
         
-        if form.is_valid():
-            email = form.cleaned_data['email']
-            password = form.cleaned_data['password']
-            
-            user = authenticate(request, username=email, password=password)
-            
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Welcome back, {user.first_name}!')
-                return redirect('vacation_list')
-            else:
-                messages.error(request, 'Invalid email or password. Please try again.')
+    Returns:
+        HttpResponse: Redirect after login, or the re-rendered form
+    """
+    retry_after = await sync_to_async(check_auth_throttle)(request, request.POST.get('email'))
+    if retry_after:
+        LOGIN_ATTEMPTS.labels('throttled').inc()
+        return await retry_later_response(request, template_name, form, 429, retry_after, THROTTLED_MESSAGE)
+    
+    if form.is_valid():
+        email = form.cleaned_data['email']
+        password = form.cleaned_data['password']
+        
+        try:
+            user = await aauthenticate(request, username=email, password=password)
+        except HashingBusy:
+            LOGIN_ATTEMPTS.labels('busy').inc()
+            return await retry_later_response(request, template_name, form, 503, 1, HASHING_BUSY_MESSAGE)
+        
+        LOGIN_ATTEMPTS.labels('success' if user is not None else 'failure').inc()
+        if user is not None:
+            await alogin(request, user)
+            messages.success(request, f'Welcome back, {user.first_name}!')
+            return redirect('vacation_list')
         else:
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(request, f"{field}: {error}")
+            messages.error(request, error_message)
     else:
-        form = UserLoginForm()
+        LOGIN_ATTEMPTS.labels('invalid').inc()
+        for field, errors in form.errors.items():
+            for error in errors:
+                messages.error(request, f"{field}: {error}")
     
-    return render(request, 'vacations/login.html', {'form': form})
+    return await render_async(request, template_name, {'form': form})
 
 
-def login_simple_view(request):
+async def login_view(request: HttpRequest) -> Union[HttpResponse, HttpResponseRedirect]:
+    """
+    Log a user in by email and password.
+    
+    Async so password checks run on the bounded hashing pool; a login burst
+    gets 503s with Retry-After once the pool queue is full instead of
+    starving other routes.
+    
+    Args:
+        request: HTTP request object containing login credentials
+        
+    Returns:
+        HttpResponse: Rendered login form, 503 under load, or redirect after authentication
+    """
+    if request.method == 'POST':
+        return await authenticate_and_login(
+            request, UserLoginForm(request.POST), 'vacations/login.html',
+            'Invalid email or password. Please try again.',
+        )
+    return await render_async(request, 'vacations/login.html', {'form': UserLoginForm()})
+
+
+async def login_simple_view(request):
     """
     Simple login view with basic authentication interface.
     
@@ -65,28 +183,11 @@ def login_simple_view(request):
         HttpResponse: Rendered simple login form or redirect after authentication
     """
     if request.method == 'POST':
-        form = UserLoginForm(request.POST)
-        
-        if form.is_valid():
-            email = form.cleaned_data['email']
-            password = form.cleaned_data['password']
-            
-            user = authenticate(request, username=email, password=password)
-            
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Welcome back, {user.first_name}!')
-                return redirect('vacation_list')
-            else:
-                messages.error(request, 'Invalid email or password.')
-        else:
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(request, f"{field}: {error}")
-    else:
-        form = UserLoginForm()
-    
-    return render(request, 'vacations/login_simple.html', {'form': form})
+        return await authenticate_and_login(
+            request, UserLoginForm(request.POST), 'vacations/login_simple.html',
+            'Invalid email or password.',
+        )
+    return await render_async(request, 'vacations/login_simple.html', {'form': UserLoginForm()})
 
 
 @login_required
@@ -105,12 +206,26 @@ def logout_view(request: HttpRequest) -> HttpResponseRedirect:
 
 
 @login_required
-def vacation_list_view(request):
+@use_replica
+@cache_control(private=True, no_cache=True)
+@async_vacation_list_condition
+async def vacation_list_view(request):
     """
     Display list of all vacation packages with like functionality.
     
     Shows different interfaces for admin users (with edit/delete options)
-    and regular users (with like/unlike functionality).
+    and regular users (with like/unlike functionality). Vacations are paged
+    with a keyset cursor; ``?after=<cursor>&partial=1`` returns just the next
+    batch of cards for infinite scroll. Card markup comes from the fragment
+    cache, with the user's like state layered on top. Conditional GETs that
+    still match the ETag get a 304 without rendering. Reads go to a replica
+    when one is configured, unless the client wrote something moments ago;
+    card keys carry the row version, so cards rendered from a lagging
+    replica never replace newer ones.
+    
+    The view is async and uses the async ORM and cache APIs. Role lookups,
+    card rendering and the page template, which may query or touch storage,
+    run in a worker thread.
     
     Args:
         request: HTTP request object (user must be authenticated)
@@ -118,21 +233,72 @@ def vacation_list_view(request):
     Returns:
         HttpResponse: Rendered vacation list page with user-specific features
     """
-    vacations = Vacation.objects.all().order_by('start_date')
-    
-    # Check if user liked each vacation
-    for vacation in vacations:
-        vacation.user_liked = vacation.is_liked_by_user(request.user)
-    
+    user = await load_request_user(request)
+    # Like totals, the user's like flag and the country are loaded in one query
+    page = await apaginate_vacations(
+        Vacation.objects.with_like_info(user),
+        request.GET.get('after'),
+        settings.VACATION_PAGE_SIZE,
+    )
+    # A role cache miss queries synchronously
+    is_admin = await sync_to_async(lambda: user.is_admin)()
+    await aattach_card_html(page.items, is_admin)
+
     context = {
-        'vacations': vacations,
-        'is_admin': request.user.is_admin
+        'vacations': page.items,
+        'next_cursor': page.next_cursor,
+        'is_admin': is_admin
     }
-    
-    if request.user.is_admin:
-        return render(request, 'vacations/admin_vacation_list.html', context)
+
+    if request.GET.get('partial'):
+        response = await render_async(request, 'vacations/_vacation_cards.html', context)
+        if page.has_next:
+            response['X-Next-Cursor'] = page.next_cursor
+        return response
+
+    if is_admin:
+        return await render_async(request, 'vacations/admin_vacation_list.html', context)
     else:
-        return render(request, 'vacations/vacation_list.html', context)
+        return await render_async(request, 'vacations/vacation_list.html', context)
+
+
+@login_required
+@use_replica
+@cache_control(private=True, no_cache=True)
+@async_vacation_list_condition
+async def vacation_feed_view(request: HttpRequest) -> JsonResponse:
+    """
+    JSON feed of vacation packages, paged with the same keyset cursor as the list.
+    
+    Args:
+        request: HTTP request object, optionally with an ``after`` cursor
+        
+    Returns:
+        JsonResponse: One page of vacations and the cursor of the next page
+    """
+    page = await apaginate_vacations(
+        Vacation.objects.with_like_info(await load_request_user(request)),
+        request.GET.get('after'),
+        settings.VACATION_PAGE_SIZE,
+    )
+    
+    return JsonResponse({
+        'vacations': [
+            {
+                'id': vacation.id,
+                'country': vacation.country.country_name,
+                'description': vacation.description,
+                'start_date': vacation.start_date.isoformat(),
+                'end_date': vacation.end_date.isoformat(),
+                'price': str(vacation.price),
+                'image_file': vacation.image_file,
+                'like_count': vacation.like_count,
+                'liked': vacation.user_liked,
+            }
+            for vacation in page.items
+        ],
+        'next_cursor': page.next_cursor,
+    })
 
 
 @login_required
@@ -155,19 +321,21 @@ def add_vacation_view(request):
     
     if request.method == 'POST':
         form = VacationForm(request.POST, request.FILES)
+        reject_oversized_uploads(request, form)
         if form.is_valid():
             vacation = form.save(commit=False)
             
-            # Handle image upload
-            if 'image' in request.FILES:
-                image = request.FILES['image']
-                filename = f"images/vacation_images/{image.name}"
-                path = default_storage.save(filename, ContentFile(image.read()))
-                vacation.image_file = path
-            else:
-                vacation.image_file = 'images/vacation_images/default.jpg'
-            
-            vacation.save()
+            # Handle image upload (streamed to storage, never read into memory).
+            # The image stays locked against deletion until the row commits.
+            with transaction.atomic():
+                if 'image' in request.FILES:
+                    vacation.image_file = save_uploaded_image(request.FILES['image'])
+                else:
+                    vacation.image_file = 'images/vacation_images/default.jpg'
+                
+                vacation.save()
+                if 'image' in request.FILES:
+                    schedule_variants(vacation)
             messages.success(request, 'Vacation added successfully!')
             return redirect('vacation_list')
         else:
@@ -198,20 +366,24 @@ def edit_vacation_view(request, vacation_id):
         return redirect('vacation_list')
     
     vacation = get_object_or_404(Vacation, id=vacation_id)
+    previous_image = vacation.image_file
     
     if request.method == 'POST':
         form = VacationForm(request.POST, request.FILES, instance=vacation)
+        reject_oversized_uploads(request, form)
         if form.is_valid():
             vacation = form.save(commit=False)
             
-            # Handle image upload
-            if 'image' in request.FILES:
-                image = request.FILES['image']
-                filename = f"images/vacation_images/{image.name}"
-                path = default_storage.save(filename, ContentFile(image.read()))
-                vacation.image_file = path
-            
-            vacation.save()
+            # Handle image upload (streamed to storage, never read into memory).
+            # The image stays locked against deletion until the row commits.
+            with transaction.atomic():
+                if 'image' in request.FILES:
+                    vacation.image_file = save_uploaded_image(request.FILES['image'])
+                
+                vacation.save()
+                if vacation.image_file != previous_image:
+                    schedule_variants(vacation)
+                    transaction.on_commit(lambda: release_image(previous_image))
             messages.success(request, 'Vacation updated successfully!')
             return redirect('vacation_list')
         else:
@@ -253,7 +425,7 @@ def delete_vacation_view(request, vacation_id):
 
 @login_required
 @require_POST
-def toggle_like_view(request: HttpRequest, vacation_id: int) -> JsonResponse:
+async def toggle_like_view(request: HttpRequest, vacation_id: int) -> JsonResponse:
     """
     Handle like/unlike functionality for vacation packages.
     
@@ -267,20 +439,62 @@ def toggle_like_view(request: HttpRequest, vacation_id: int) -> JsonResponse:
     Returns:
         JsonResponse: Updated like status and total like count
     """
-    vacation = get_object_or_404(Vacation, id=vacation_id)
-    like, created = Like.objects.get_or_create(
-        user=request.user,
-        vacation=vacation
-    )
-    
-    if not created:
-        like.delete()
-        liked = False
-    else:
-        liked = True
+    # One round trip on PostgreSQL; safe against concurrent double clicks
+    result = await Like.objects.atoggle(await load_request_user(request), vacation_id)
+    if result is None:
+        raise Http404('Vacation not found')
+    liked, like_count = result
     
     return JsonResponse({
         'success': True,
         'liked': liked,
-        'like_count': vacation.like_count
+        'like_count': like_count
     })
+
+
+@login_required
+@require_safe
+def query_metrics_view(request: HttpRequest) -> JsonResponse:
+    """
+    Dump this worker's per-view SQL fingerprint statistics (admins only).
+    
+    Each worker process keeps its own figures since it started; ``?view=``
+    narrows the dump to one URL name.
+    
+    Args:
+        request: HTTP request object (user must be an admin)
+        
+    Returns:
+        JsonResponse: Aggregates by view and fingerprint, highest total time first
+    """
+    if not request.user.is_admin:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    
+    entries = query_stats.snapshot()
+    view_name = request.GET.get('view')
+    if view_name:
+        entries = [entry for entry in entries if entry['view'] == view_name]
+    return JsonResponse({
+        'pid': os.getpid(),
+        'slow_query_ms': settings.SLOW_QUERY_MS,
+        'queries': entries,
+    })
+
+
+@require_safe
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """
+    Expose Prometheus metrics to the scraper's address or to admins.
+    
+    Args:
+        request: HTTP request object
+        
+    Returns:
+        HttpResponse: Metrics in the Prometheus text format, or 403
+    """
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS or (
+        request.user.is_authenticated and request.user.is_admin
+    )
+    if not allowed:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)